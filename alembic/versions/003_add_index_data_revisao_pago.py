@@ -0,0 +1,26 @@
+"""add_index_data_revisao_pago
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-01-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Índice para filtros por período nos relatórios financeiros
+    op.create_index('ix_checklists_data_revisao_pago', 'checklists', ['data_revisao', 'pago'])
+
+
+def downgrade() -> None:
+    # Remove o índice
+    op.drop_index('ix_checklists_data_revisao_pago', table_name='checklists')
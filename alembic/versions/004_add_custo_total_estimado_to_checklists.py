@@ -0,0 +1,40 @@
+"""add_custo_total_estimado_to_checklists
+
+Revision ID: 004
+Revises: 003
+Create Date: 2024-01-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Adiciona coluna custo_total_estimado na tabela checklists
+    op.add_column(
+        'checklists',
+        sa.Column('custo_total_estimado', sa.Float(), nullable=False, server_default='0')
+    )
+    # Preenche com a soma dos itens que necessitam troca
+    op.execute(
+        """
+        UPDATE checklists SET custo_total_estimado = COALESCE((
+            SELECT SUM(checklist_itens.custo_estimado)
+            FROM checklist_itens
+            WHERE checklist_itens.checklist_id = checklists.id
+              AND checklist_itens.status = 'necessita_troca'
+        ), 0)
+        """
+    )
+
+
+def downgrade() -> None:
+    # Remove a coluna
+    op.drop_column('checklists', 'custo_total_estimado')
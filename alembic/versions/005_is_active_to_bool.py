@@ -0,0 +1,49 @@
+"""is_active_to_bool
+
+Revision ID: 005
+Revises: 004
+Create Date: 2024-01-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Converte usuarios.is_active de texto ("true"/"false") para boolean
+    if op.get_bind().dialect.name == "sqlite":
+        # No SQLite a tabela é recriada copiando os valores; grava 1/0 antes
+        op.execute("UPDATE usuarios SET is_active = CASE WHEN is_active = 'true' THEN 1 ELSE 0 END")
+
+    with op.batch_alter_table('usuarios') as batch_op:
+        batch_op.alter_column(
+            'is_active',
+            existing_type=sa.String(length=10),
+            type_=sa.Boolean(),
+            existing_nullable=False,
+            server_default=sa.true(),
+            postgresql_using="is_active::boolean",
+        )
+
+
+def downgrade() -> None:
+    # Volta is_active para texto
+    with op.batch_alter_table('usuarios') as batch_op:
+        batch_op.alter_column(
+            'is_active',
+            existing_type=sa.Boolean(),
+            type_=sa.String(length=10),
+            existing_nullable=False,
+            server_default=None,
+            postgresql_using="CASE WHEN is_active THEN 'true' ELSE 'false' END",
+        )
+
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("UPDATE usuarios SET is_active = CASE WHEN is_active = 1 THEN 'true' ELSE 'false' END")
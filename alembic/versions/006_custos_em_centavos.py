@@ -0,0 +1,50 @@
+"""custos_em_centavos
+
+Revision ID: 006
+Revises: 005
+Create Date: 2024-01-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Custos do checklist em centavos (inteiros) para somas exatas no analytics
+    op.add_column('checklists', sa.Column('custo_real_centavos', sa.Integer(), nullable=True))
+    op.add_column(
+        'checklists',
+        sa.Column('custo_total_estimado_centavos', sa.Integer(), nullable=False, server_default='0')
+    )
+    op.execute(
+        """
+        UPDATE checklists SET
+            custo_real_centavos = CAST(ROUND(custo_real * 100) AS INTEGER),
+            custo_total_estimado_centavos = CAST(ROUND(custo_total_estimado * 100) AS INTEGER)
+        """
+    )
+
+    # custo_total_estimado (float) passa a ser guardado só em centavos
+    with op.batch_alter_table('checklists') as batch_op:
+        batch_op.drop_column('custo_total_estimado')
+
+
+def downgrade() -> None:
+    # Volta custo_total_estimado para float
+    op.add_column(
+        'checklists',
+        sa.Column('custo_total_estimado', sa.Float(), nullable=False, server_default='0')
+    )
+    op.execute("UPDATE checklists SET custo_total_estimado = custo_total_estimado_centavos / 100.0")
+
+    # Remove as colunas em centavos
+    with op.batch_alter_table('checklists') as batch_op:
+        batch_op.drop_column('custo_total_estimado_centavos')
+        batch_op.drop_column('custo_real_centavos')
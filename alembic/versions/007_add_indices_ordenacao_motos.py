@@ -0,0 +1,29 @@
+"""add_indices_ordenacao_motos
+
+Revision ID: 007
+Revises: 006
+Create Date: 2024-01-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Índices para ORDER BY na listagem paginada de motos
+    # (placa já é única/indexada; checklists.data_revisao usa ix_checklists_data_revisao_pago)
+    op.create_index('ix_motos_modelo', 'motos', ['modelo'])
+    op.create_index('ix_motos_ano', 'motos', ['ano'])
+
+
+def downgrade() -> None:
+    # Remove os índices
+    op.drop_index('ix_motos_ano', table_name='motos')
+    op.drop_index('ix_motos_modelo', table_name='motos')
@@ -0,0 +1,39 @@
+"""normalizar_placas
+
+Revision ID: 008
+Revises: 007
+Create Date: 2024-01-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+# Mesma regra de controle.validadores.normalizar_placa
+_PLACA_NORMALIZADA = "UPPER(REPLACE(REPLACE(TRIM(placa), '-', ''), ' ', ''))"
+
+
+def upgrade() -> None:
+    # As buscas usam `placa = :placa` com o valor normalizado (índice único
+    # ix_motos_placa); linhas antigas gravadas com hífen/minúsculas não seriam achadas
+    bind = op.get_bind()
+    duplicadas = bind.execute(sa.text(
+        f"SELECT {_PLACA_NORMALIZADA} FROM motos GROUP BY {_PLACA_NORMALIZADA} HAVING COUNT(*) > 1"
+    )).scalars().all()
+    if duplicadas:
+        raise RuntimeError(
+            f"Placas duplicadas após normalização, resolva antes de migrar: {', '.join(duplicadas)}"
+        )
+
+    op.execute(f"UPDATE motos SET placa = {_PLACA_NORMALIZADA} WHERE placa <> {_PLACA_NORMALIZADA}")
+
+
+def downgrade() -> None:
+    # O formato original das placas não é guardado; nada a desfazer
+    pass
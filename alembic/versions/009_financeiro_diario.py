@@ -0,0 +1,50 @@
+"""financeiro_diario
+
+Revision ID: 009
+Revises: 008
+Create Date: 2024-01-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+# Mesma SQL de db.resumos.CRIAR_FINANCEIRO_DIARIO
+_CRIAR_FINANCEIRO_DIARIO = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS financeiro_diario AS
+SELECT
+    data_revisao,
+    moto_id,
+    COUNT(*) AS quantidade_servicos,
+    COUNT(*) FILTER (WHERE pago) AS checklists_pagos,
+    COALESCE(SUM(custo_total_estimado_centavos) FILTER (WHERE pago), 0) AS receitas_centavos,
+    COALESCE(SUM(custo_real_centavos), 0) AS custos_centavos
+FROM checklists
+GROUP BY data_revisao, moto_id
+WITH DATA
+"""
+
+
+def upgrade() -> None:
+    # Totais financeiros por dia e moto para o /api/financeiro (só PostgreSQL;
+    # no SQLite o relatório agrega direto na tabela checklists)
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(_CRIAR_FINANCEIRO_DIARIO)
+    # Índice único: exigido pelo REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_financeiro_diario_data_moto "
+        "ON financeiro_diario (data_revisao, moto_id)"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS financeiro_diario")
@@ -1,12 +1,152 @@
 # analytics/oficina_analytics.py
-from typing import List, Dict, Optional
+import threading
+from typing import Any, Callable, Iterable, List, Dict, Optional, NamedTuple, Tuple, Union
 from datetime import date, timedelta
 
 import numpy as np
 
+try:
+    # numba é opcional: se estiver instalado, compila a regressão linear
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        """Substituto sem efeito quando numba não está disponível."""
+        def decorador(func):
+            return func
+        return decorador
+
 from controle.oficina_controller import OficinaController
 from modelo.checklist import Checklist
 from modelo.checklist_item import StatusItem
+from utils.moeda import array_para_centavos
+
+
+# Códigos inteiros dos status, usados para contar itens com np.bincount
+_CODIGO_STATUS = {
+    StatusItem.CONCLUIDO: 0,
+    StatusItem.PENDENTE: 1,
+    StatusItem.NECESSITA_TROCA: 2,
+    StatusItem.IGNORADO: 3,
+}
+
+
+def _limites_semana(d: date) -> Tuple[date, date]:
+    """Segunda-feira a domingo da semana de d."""
+    segunda = d - timedelta(days=d.weekday())
+    return segunda, segunda + timedelta(days=6)
+
+
+def _limites_mes(d: date) -> Tuple[date, date]:
+    """Primeiro e último dia do mês de d."""
+    primeiro = d.replace(day=1)
+    # Dia 1 + 32 dias sempre cai no mês seguinte
+    proximo = (primeiro + timedelta(days=32)).replace(day=1)
+    return primeiro, proximo - timedelta(days=1)
+
+
+# Tipo de período -> função que calcula (data_inicio, data_fim) a partir da referência
+_LIMITES_POR_PERIODO: Dict[str, Callable[[date], Tuple[date, date]]] = {
+    "dia": lambda d: (d, d),
+    "semana": _limites_semana,
+    "mes": _limites_mes,
+    "ano": lambda d: (date(d.year, 1, 1), date(d.year, 12, 31)),
+}
+
+
+@njit(cache=True)
+def _linreg(x: np.ndarray, y: np.ndarray):
+    """
+    Regressão linear simples (y = a*x + b) por mínimos quadrados,
+    na forma fechada: a = cov(x, y) / var(x), b = média(y) - a * média(x).
+    Retorna (nan, nan) se todos os x forem iguais.
+    """
+    media_x = x.mean()
+    media_y = y.mean()
+    dx = x - media_x
+    # Duas somas de produtos: sem matriz de Vandermonde nem SVD (np.polyfit).
+    # Sem np.dot, que no numba exige o BLAS do SciPy
+    sxx = (dx * dx).sum()
+    if sxx == 0.0:
+        return np.nan, np.nan
+    a = (dx * (y - media_y)).sum() / sxx
+    b = media_y - a * media_x
+    return a, b
+
+
+class _Snapshot(NamedTuple):
+    """
+    Colunas (uma por atributo) extraídas de uma única leitura dos checklists.
+    Todos os arrays são alinhados: a posição i se refere ao mesmo checklist.
+    """
+    kms: np.ndarray
+    custos_centavos: np.ndarray  # custo total estimado, em centavos (int64)
+    custos_reais_centavos: np.ndarray  # custo real em centavos (0 quando não informado)
+    tem_custo_real: np.ndarray  # True quando o custo real foi informado
+    pagos: np.ndarray
+    motos: np.ndarray  # identifica a moto de cada checklist (placa ou id no banco)
+    finalizados: np.ndarray
+
+    @property
+    def custos(self) -> np.ndarray:
+        """Custo total estimado em R$ (float)."""
+        return self.custos_centavos / 100.0
+
+    @property
+    def custos_reais(self) -> np.ndarray:
+        """Custo real em R$ (float), NaN quando não informado."""
+        return np.where(self.tem_custo_real, self.custos_reais_centavos / 100.0, np.nan)
+
+
+class _ListaChecklists:
+    """
+    Fonte de dados mínima sobre uma lista fixa de checklists, para analisar
+    um subconjunto sem precisar montar um OficinaController inteiro.
+    """
+
+    def __init__(self, checklists: Iterable[Checklist]):
+        self._checklists = list(checklists)
+
+    def listar_checklists(self) -> List[Checklist]:
+        return self._checklists
+
+    def buscar_checklists_por_periodo(
+        self,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None
+    ) -> List[Checklist]:
+        return [
+            c for c in self._checklists
+            if (data_inicio is None or c.data_revisao >= data_inicio)
+            and (data_fim is None or c.data_revisao <= data_fim)
+        ]
+
+
+class MemoAnalytics:
+    """
+    Resultados já calculados pelo analytics, válidos para uma versão dos dados.
+    Cada OficinaAnalytics tem o seu; a API com banco (um analytics por
+    requisição) passa o mesmo objeto para todos, reaproveitando os cálculos
+    entre requisições enquanto a versão não mudar.
+    """
+
+    def __init__(self):
+        self._versao: Any = None
+        self._valores: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def obter(self, versao: Any, chave: str) -> Tuple[bool, Any]:
+        """Retorna (encontrado, valor); uma versão nova descarta tudo o que havia."""
+        with self._lock:
+            if versao != self._versao:
+                self._versao = versao
+                self._valores = {}
+            return chave in self._valores, self._valores.get(chave)
+
+    def guardar(self, versao: Any, chave: str, valor: Any) -> None:
+        # Calculado sobre uma versão que já mudou: não guarda
+        with self._lock:
+            if versao == self._versao:
+                self._valores[chave] = valor
 
 
 class OficinaAnalytics:
@@ -15,8 +155,36 @@ class OficinaAnalytics:
     a partir dos dados da oficina (checklists, custos, status, km, etc.).
     """
 
-    def __init__(self, controller: OficinaController):
+    def __init__(
+        self,
+        controller: Union[OficinaController, Iterable[Checklist]],
+        memo: Optional[MemoAnalytics] = None
+    ):
+        """
+        `controller` pode ser um controller (memória ou banco) ou diretamente
+        uma lista/iterável de checklists já filtrados.
+        `memo` permite compartilhar os resultados entre instâncias (ver MemoAnalytics).
+        """
+        if not hasattr(controller, "listar_checklists"):
+            controller = _ListaChecklists(controller)
         self._controller = controller
+        self._memo = memo if memo is not None else MemoAnalytics()
+
+    def _memorizado(self, chave: str, calcular: Callable[[], Any]) -> Any:
+        """
+        Reaproveita o resultado de `calcular` enquanto a versão dos dados do
+        controller não mudar. Fontes sem `versao` (ex.: lista de checklists)
+        recalculam sempre.
+        """
+        versao = getattr(self._controller, "versao", None)
+        if versao is None:
+            return calcular()
+
+        encontrado, valor = self._memo.obter(versao, chave)
+        if not encontrado:
+            valor = calcular()
+            self._memo.guardar(versao, chave, valor)
+        return valor
 
     def _obter_checklists(self) -> List[Checklist]:
         """
@@ -24,6 +192,50 @@ class OficinaAnalytics:
         """
         return self._controller.listar_checklists()
 
+    def _snapshot(
+        self,
+        checklists: Optional[List[Checklist]] = None,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None
+    ) -> _Snapshot:
+        """
+        Lê os checklists uma única vez e monta as colunas NumPy usadas
+        pelas métricas, evitando várias idas ao controller (e ao banco)
+        dentro da mesma operação.
+
+        Se o controller souber entregar as colunas prontas (colunas_checklists,
+        no controller de banco), elas são usadas diretamente, sem montar
+        objetos Checklist.
+        """
+        if checklists is None:
+            colunas_checklists = getattr(self._controller, "colunas_checklists", None)
+            if colunas_checklists is not None:
+                return _Snapshot(**colunas_checklists(data_inicio=data_inicio, data_fim=data_fim))
+            checklists = self._controller.buscar_checklists_por_periodo(
+                data_inicio=data_inicio,
+                data_fim=data_fim
+            )
+
+        # np.fromiter com count aloca o array uma vez só, sem lista intermediária
+        n = len(checklists)
+        custos_reais = np.fromiter(
+            (np.nan if c.custo_real is None else c.custo_real for c in checklists),
+            dtype=np.float64,
+            count=n,
+        )
+        tem_custo_real = ~np.isnan(custos_reais)
+        return _Snapshot(
+            kms=np.fromiter((c.km_atual for c in checklists), dtype=np.int64, count=n),
+            custos_centavos=array_para_centavos(np.fromiter(
+                (c.custo_total_estimado() for c in checklists), dtype=np.float64, count=n
+            )),
+            custos_reais_centavos=array_para_centavos(np.where(tem_custo_real, custos_reais, 0.0)),
+            tem_custo_real=tem_custo_real,
+            pagos=np.fromiter((c.pago for c in checklists), dtype=bool, count=n),
+            motos=np.fromiter((c.moto.placa for c in checklists), dtype=object, count=n),
+            finalizados=np.fromiter((c.finalizado for c in checklists), dtype=bool, count=n),
+        )
+
     # ---------------------- MÉTRICAS BÁSICAS ----------------------
 
     def custos_totais_array(self) -> np.ndarray:
@@ -31,24 +243,29 @@ class OficinaAnalytics:
         Retorna um array NumPy com o custo total estimado das trocas
         de cada checklist (valor em R$).
         """
-        checklists = self._obter_checklists()
-        custos = [c.custo_total_estimado() for c in checklists]
-        return np.array(custos, dtype=float)
+        return self._snapshot().custos
 
     def km_array(self) -> np.ndarray:
         """
         Retorna um array NumPy com as quilometragens dos checklists.
         """
-        checklists = self._obter_checklists()
-        kms = [c.km_atual for c in checklists]
-        return np.array(kms, dtype=int)
+        return self._snapshot().kms
 
-    def resumo_custos(self) -> Dict[str, float]:
+    def resumo_custos(self, checklists: Optional[List[Checklist]] = None) -> Dict[str, float]:
         """
         Retorna um dicionário com estatísticas básicas dos custos:
         - soma, média, máximo, mínimo
+        Se `checklists` for informado, calcula sobre essa lista em vez de
+        todos os checklists do controller.
+        """
+        if checklists is not None:
+            return self._resumo(self._snapshot(checklists).custos)
+        return dict(self._memorizado("resumo_custos", lambda: self._resumo(self._snapshot().custos)))
+
+    def _resumo(self, custos: np.ndarray) -> Dict[str, float]:
+        """
+        Estatísticas básicas (soma, média, máximo, mínimo) de um array de custos.
         """
-        custos = self.custos_totais_array()
         if custos.size == 0:
             return {
                 "soma": 0.0,
@@ -71,27 +288,34 @@ class OficinaAnalytics:
         - pendentes
         - necessitando troca
         """
-        checklists = self._obter_checklists()
-        total_concluido = 0
-        total_pendente = 0
-        total_troca = 0
+        return dict(self._memorizado("distribuicao_status_itens", self._contar_status_itens))
 
-        for c in checklists:
-            total_concluido += c.total_concluido()
-            total_pendente += c.total_pendente()
-            total_troca += c.total_necessita_troca()
+    def _contar_status_itens(self) -> Dict[str, int]:
+        status = self.status_itens_array()
+        contagem = np.bincount(status, minlength=len(_CODIGO_STATUS))
 
         return {
-            "concluido": total_concluido,
-            "pendente": total_pendente,
-            "necessita_troca": total_troca,
+            "concluido": int(contagem[_CODIGO_STATUS[StatusItem.CONCLUIDO]]),
+            "pendente": int(contagem[_CODIGO_STATUS[StatusItem.PENDENTE]]),
+            "necessita_troca": int(contagem[_CODIGO_STATUS[StatusItem.NECESSITA_TROCA]]),
         }
 
+    def status_itens_array(self) -> np.ndarray:
+        """
+        Retorna um array NumPy (int8) com o código do status de cada item,
+        concatenando os itens de todos os checklists.
+        """
+        checklists = self._obter_checklists()
+        return np.fromiter(
+            (_CODIGO_STATUS[item.status] for c in checklists for item in c.itens),
+            dtype=np.int8,
+        )
+
     # ---------------------- EXEMPLO "MLzinho" ----------------------
 
     def estimar_custo_por_km(self) -> Dict[str, float] | None:
         """
-        Usa uma regressão linear simples (NumPy polyfit) para estimar
+        Usa uma regressão linear simples (mínimos quadrados) para estimar
         custo de revisão em função da quilometragem.
 
         Retorna:
@@ -99,15 +323,33 @@ class OficinaAnalytics:
         - coef_linear (b)
         Ou None se não houver dados suficientes.
         """
-        kms = self.km_array()
-        custos = self.custos_totais_array()
+        modelo = self._modelo_linear()
+        return dict(modelo) if modelo is not None else None
+
+    def _modelo_linear(self) -> Dict[str, float] | None:
+        """
+        Coeficientes da regressão, reaproveitados enquanto a versão dos dados
+        do controller não mudar (fontes sem `versao` recalculam sempre).
+        """
+        return self._memorizado("modelo_linear", lambda: self._ajustar_reta(self._snapshot()))
+
+    def _ajustar_reta(self, snapshot: _Snapshot) -> Dict[str, float] | None:
+        """
+        Ajusta custo x km sobre um snapshot já carregado.
+        """
+        kms = snapshot.kms
+        custos = snapshot.custos
 
         # Precisamos de pelo menos 2 pontos para ajustar uma reta
         if kms.size < 2 or custos.size < 2:
             return None
 
-        # polyfit de grau 1 -> y = a*x + b
-        a, b = np.polyfit(kms, custos, 1)
+        # Reta de grau 1 -> y = a*x + b
+        # custos já é float64 (asarray não copia); km precisa ser convertido
+        a, b = _linreg(kms.astype(np.float64), np.asarray(custos, dtype=np.float64))
+        if np.isnan(a):
+            # Todas as revisões na mesma km: não há como ajustar uma reta
+            return None
         return {"coef_angular": float(a), "coef_linear": float(b)}
 
     def prever_custo_para_km(self, km_futuro: int) -> float | None:
@@ -115,7 +357,7 @@ class OficinaAnalytics:
         Usa o modelo linear para prever um custo aproximado
         para uma futura revisão na quilometragem informada.
         """
-        modelo = self.estimar_custo_por_km()
+        modelo = self._modelo_linear()
         if modelo is None:
             return None
 
@@ -129,31 +371,17 @@ class OficinaAnalytics:
         Retorna um array NumPy com os custos reais das revisões.
         Filtra apenas checklists que têm custo_real informado.
         """
-        checklists = self._obter_checklists()
-        custos = [c.custo_real for c in checklists if c.custo_real is not None]
-        return np.array(custos, dtype=float) if custos else np.array([], dtype=float)
+        snapshot = self._snapshot()
+        return snapshot.custos_reais_centavos[snapshot.tem_custo_real] / 100.0
     
     def resumo_custos_reais(self) -> Dict[str, float]:
         """
         Retorna estatísticas dos custos reais (quando informados).
         """
         custos = self.custos_reais_array()
-        if custos.size == 0:
-            return {
-                "soma": 0.0,
-                "media": 0.0,
-                "max": 0.0,
-                "min": 0.0,
-                "total_com_custo_real": 0
-            }
-        
-        return {
-            "soma": float(np.sum(custos)),
-            "media": float(np.mean(custos)),
-            "max": float(np.max(custos)),
-            "min": float(np.min(custos)),
-            "total_com_custo_real": int(custos.size)
-        }
+        resumo = self._resumo(custos)
+        resumo["total_com_custo_real"] = int(custos.size)
+        return resumo
     
     def dados_historicos_graficos(self) -> Dict:
         """
@@ -161,22 +389,43 @@ class OficinaAnalytics:
         Inclui custos estimados, custos reais, KM e datas.
         """
         checklists = self._obter_checklists()
-        dados = []
+        n = len(checklists)
         
-        for c in checklists:
-            dados.append({
-                "data": c.data_revisao.isoformat(),
-                "data_formatada": c.data_formatada,
-                "km": c.km_atual,
-                "custo_estimado": c.custo_total_estimado(),
-                "custo_real": c.custo_real if c.custo_real is not None else None,
-                "moto": f"{c.moto.modelo} - {c.moto.placa}",
-                "finalizado": c.finalizado,
-                "pago": c.pago
-            })
+        # Monta uma coluna por campo (SoA) e ordena todas de uma vez por data,
+        # com argsort estável sobre datetime64 (mesma ordem do sort do Python)
+        datas = np.fromiter((c.data_revisao for c in checklists), dtype="datetime64[D]", count=n)
+        ordem = np.argsort(datas, kind="stable")
         
-        # Ordena por data
-        dados.sort(key=lambda x: x["data"])
+        datas_iso = np.datetime_as_string(datas[ordem]).tolist()
+        kms = np.fromiter((c.km_atual for c in checklists), dtype=np.int64, count=n)[ordem].tolist()
+        custos = np.fromiter(
+            (c.custo_total_estimado() for c in checklists), dtype=np.float64, count=n
+        )[ordem].tolist()
+        custos_reais = np.fromiter(
+            (c.custo_real for c in checklists), dtype=object, count=n
+        )[ordem].tolist()
+        motos = np.fromiter(
+            (f"{c.moto.modelo} - {c.moto.placa}" for c in checklists), dtype=object, count=n
+        )[ordem].tolist()
+        finalizados = np.fromiter((c.finalizado for c in checklists), dtype=bool, count=n)[ordem].tolist()
+        pagos = np.fromiter((c.pago for c in checklists), dtype=bool, count=n)[ordem].tolist()
+        
+        # Só na saída as colunas viram linhas (formato consumido pelos gráficos)
+        dados = [
+            {
+                "data": iso,
+                "data_formatada": f"{iso[8:10]}/{iso[5:7]}/{iso[0:4]}",
+                "km": km,
+                "custo_estimado": custo,
+                "custo_real": custo_real,
+                "moto": moto,
+                "finalizado": finalizado,
+                "pago": pago
+            }
+            for iso, km, custo, custo_real, moto, finalizado, pago in zip(
+                datas_iso, kms, custos, custos_reais, motos, finalizados, pagos
+            )
+        ]
         
         return {
             "dados": dados,
@@ -203,45 +452,33 @@ class OficinaAnalytics:
         - checklists_nao_pagos: Número de checklists não pagos
         - ticket_medio: Receitas / quantidade_servicos (se houver serviços)
         """
-        # Obtém checklists do período
-        if hasattr(self._controller, 'buscar_checklists_por_periodo'):
-            checklists = self._controller.buscar_checklists_por_periodo(
-                data_inicio=data_inicio,
-                data_fim=data_fim
-            )
+        resumo_financeiro = getattr(self._controller, "resumo_financeiro", None)
+        if resumo_financeiro is not None:
+            # Controller de banco: totais já agregados no SQL (visão
+            # financeiro_diario no PostgreSQL), sem ler os checklists
+            totais = resumo_financeiro(data_inicio=data_inicio, data_fim=data_fim)
+            receitas_centavos = totais["receitas_centavos"]
+            custos_centavos = totais["custos_centavos"]
+            checklists_pagos = totais["checklists_pagos"]
+            quantidade_servicos = totais["quantidade_servicos"]
+            quantidade_motos = totais["quantidade_motos"]
         else:
-            # Fallback para controller em memória
-            checklists = self._obter_checklists()
-            if data_inicio:
-                checklists = [c for c in checklists if c.data_revisao >= data_inicio]
-            if data_fim:
-                checklists = [c for c in checklists if c.data_revisao <= data_fim]
-        
-        # Calcula métricas
-        receitas = 0.0  # Valor da Revisão (custo_total_estimado) de checklists PAGOS
-        custos = 0.0    # Custo Real das Peças/Produtos (custo_real) de TODOS os checklists
-        motos_unicas = set()
-        checklists_pagos = 0
-        checklists_nao_pagos = 0
-        
-        for checklist in checklists:
-            # Conta motos únicas
-            motos_unicas.add(checklist.moto.placa)
-            
-            # Soma custos reais das peças/produtos (se informado)
-            if checklist.custo_real is not None:
-                custos += checklist.custo_real
-            
-            # Se está pago, conta o valor da revisão como receita
-            if checklist.pago:
-                receitas += checklist.custo_total_estimado()
-                checklists_pagos += 1
-            else:
-                checklists_nao_pagos += 1
-        
-        quantidade_servicos = len(checklists)
-        quantidade_motos = len(motos_unicas)
-        lucro = receitas - custos
+            # Colunas dos checklists do período (o filtro fica a cargo do controller)
+            snapshot = self._snapshot(data_inicio=data_inicio, data_fim=data_fim)
+
+            # Somas em centavos (inteiros): exatas, convertidas para R$ só no final
+            # Valor da Revisão (custo_total_estimado) de checklists PAGOS
+            receitas_centavos = int(snapshot.custos_centavos[snapshot.pagos].sum())
+            # Custo Real das Peças/Produtos (custo_real) de TODOS os checklists
+            custos_centavos = int(snapshot.custos_reais_centavos.sum())
+            checklists_pagos = int(snapshot.pagos.sum())
+            quantidade_servicos = int(snapshot.pagos.size)
+            quantidade_motos = int(np.unique(snapshot.motos).size)
+
+        checklists_nao_pagos = quantidade_servicos - checklists_pagos
+        receitas = receitas_centavos / 100
+        custos = custos_centavos / 100
+        lucro = (receitas_centavos - custos_centavos) / 100
         ticket_medio = receitas / quantidade_servicos if quantidade_servicos > 0 else 0.0
         
         return {
@@ -254,8 +491,8 @@ class OficinaAnalytics:
             "checklists_nao_pagos": checklists_nao_pagos,
             "ticket_medio": float(ticket_medio),
             "periodo": {
-                "data_inicio": data_inicio.isoformat() if data_inicio else None,
-                "data_fim": data_fim.isoformat() if data_fim else None,
+                "data_inicio": data_inicio,
+                "data_fim": data_fim,
             }
         }
     
@@ -277,28 +514,9 @@ class OficinaAnalytics:
         if data_referencia is None:
             data_referencia = date.today()
         
-        data_inicio = None
-        data_fim = None
-        
-        if tipo_periodo == 'dia':
-            data_inicio = data_referencia
-            data_fim = data_referencia
-        elif tipo_periodo == 'semana':
-            # Segunda-feira da semana
-            dias_para_segunda = (data_referencia.weekday()) % 7
-            data_inicio = data_referencia - timedelta(days=dias_para_segunda)
-            data_fim = data_inicio + timedelta(days=6)
-        elif tipo_periodo == 'mes':
-            data_inicio = date(data_referencia.year, data_referencia.month, 1)
-            # Último dia do mês
-            if data_referencia.month == 12:
-                data_fim = date(data_referencia.year + 1, 1, 1) - timedelta(days=1)
-            else:
-                data_fim = date(data_referencia.year, data_referencia.month + 1, 1) - timedelta(days=1)
-        elif tipo_periodo == 'ano':
-            data_inicio = date(data_referencia.year, 1, 1)
-            data_fim = date(data_referencia.year, 12, 31)
-        else:
+        try:
+            data_inicio, data_fim = _LIMITES_POR_PERIODO[tipo_periodo](data_referencia)
+        except KeyError:
             raise ValueError(f"Tipo de período inválido: {tipo_periodo}")
         
         return self.relatorio_financeiro(data_inicio=data_inicio, data_fim=data_fim)
\ No newline at end of file
@@ -2,19 +2,42 @@
 """
 Endpoints de autenticação.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 
 from database import get_db
 from db.repository import UsuarioRepository
-from auth.security import verify_password, get_password_hash, create_access_token
+from auth.security import verify_password, get_password_hash, get_dummy_password_hash, create_access_token
 from auth.dependencies import get_current_user, get_current_active_user
+from auth.rate_limit import LimitadorTentativas
+from api.orjson_response import ORJSONResponse
+from config import settings
 from db.models import UsuarioDB
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
+# Limite de tentativas de login por IP (aplicado antes do bcrypt)
+limitador_login = LimitadorTentativas(settings.LOGIN_RATE_LIMIT_PER_MINUTE, janela_segundos=60.0)
+
+
+def _ip_cliente(request: Request) -> str:
+    return request.client.host if request.client else "desconhecido"
+
+
+def limitar_tentativas_login(request: Request) -> None:
+    """
+    Dependency que recusa o login quando o IP excede o limite de tentativas.
+    A tentativa já conta aqui (antes do bcrypt); o login bem-sucedido a desfaz.
+    """
+    if not limitador_login.permitir(_ip_cliente(request)):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas de login. Tente novamente em instantes.",
+            headers={"Retry-After": "60"},
+        )
+
 
 class UserCreate(BaseModel):
     """Schema para criação de usuário."""
@@ -36,27 +59,38 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 
+def _usuario_para_dict(usuario: UsuarioDB) -> dict:
+    """Converte o usuário do banco no formato de UserResponse (sem passar pelo Pydantic)."""
+    return {
+        "id": usuario.id,
+        "username": usuario.username,
+        "email": usuario.email,
+        "is_active": usuario.is_active,
+        "is_admin": usuario.is_admin == "true",
+    }
+
+
 class Token(BaseModel):
     """Schema de resposta para token."""
     access_token: str
     token_type: str = "bearer"
 
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/register",
+    response_model=None,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_201_CREATED: {"model": UserResponse}}
+)
 def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Registra um novo usuário."""
-    # Verifica se username já existe
-    if UsuarioRepository.buscar_por_username(db, user_data.username):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username já está em uso"
-        )
-    
-    # Verifica se email já existe
-    if UsuarioRepository.buscar_por_email(db, user_data.email):
+    # Verifica se username ou email já existem (uma única consulta)
+    existente = UsuarioRepository.buscar_por_username_ou_email(db, user_data.username, user_data.email)
+    if existente:
+        campo = "Username" if existente.username == user_data.username else "Email"
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email já está em uso"
+            detail=f"{campo} já está em uso"
         )
     
     # Cria usuário
@@ -69,11 +103,12 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         is_admin=user_data.is_admin
     )
     
-    return usuario
+    return ORJSONResponse(_usuario_para_dict(usuario), status_code=status.HTTP_201_CREATED)
 
 
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=Token, dependencies=[Depends(limitar_tentativas_login)])
 def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
@@ -82,25 +117,32 @@ def login(
     """
     user = UsuarioRepository.buscar_por_username(db, form_data.username)
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    # Sempre verifica um hash (fictício se o usuário não existe), para que
+    # usuário inexistente e senha errada levem o mesmo tempo
+    hashed_password = user.hashed_password if user else get_dummy_password_hash()
+    senha_correta = verify_password(form_data.password, hashed_password)
+    
+    if not user or not senha_correta:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Username ou senha incorretos",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if user.is_active != "true":
+    if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Usuário inativo"
         )
     
+    # Senha correta: não conta contra o limite de tentativas do IP
+    limitador_login.desfazer(_ip_cliente(request))
     access_token = create_access_token(data={"sub": user.username})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
-@router.get("/me", response_model=UserResponse)
+@router.get("/me", response_model=None, responses={200: {"model": UserResponse}})
 def get_current_user_info(current_user: UsuarioDB = Depends(get_current_active_user)):
     """Retorna informações do usuário atual."""
-    return current_user
+    return ORJSONResponse(_usuario_para_dict(current_user))
 
@@ -0,0 +1,200 @@
+# api/cache_respostas.py
+"""
+Cache de respostas GET (cache-aside) com TTL por grupo de endpoints.
+Serve os bytes já serializados, sem passar pelo banco nem pela serialização.
+
+O cache fica em memória, por processo. Escritas (POST/PUT/PATCH/DELETE) em
+/api/motos e /api/checklists invalidam os grupos afetados. Com vários workers,
+os outros processos só enxergam a mudança quando o TTL (curto) expira.
+
+Um HIT não passa pelo get_current_user da rota, então antes de servi-lo o
+token é validado (assinatura e expiração) e o usuário precisa estar ativo no
+cache_usuarios. Um usuário desativado deixa de receber respostas do cache no
+mesmo prazo em que a rota passaria a recusá-lo (AUTH_USER_CACHE_TTL_SECONDS).
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from auth.dependencies import cache_usuarios
+from auth.security import decode_access_token
+
+
+# TTLs (segundos) por tipo de dado
+TTL_CURTO = 5.0     # listas de checklists mudam com frequência
+TTL_NORMAL = 30.0   # motos
+TTL_LONGO = 60.0    # analytics / financeiro
+
+# Prefixo do path -> (grupo, TTL). O primeiro prefixo que casar vale.
+_POLITICAS: Tuple[Tuple[str, str, float], ...] = (
+    ("/api/checklists", "checklists", TTL_CURTO),
+    ("/api/motos", "motos", TTL_NORMAL),
+    ("/api/analytics", "analytics", TTL_LONGO),
+    ("/api/financeiro", "analytics", TTL_LONGO),
+)
+
+# Prefixo do path de escrita -> grupos invalidados
+# (checklists embutem a moto; analytics depende de ambos)
+_INVALIDACOES: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("/api/motos", ("motos", "checklists", "analytics")),
+    ("/api/checklists", ("checklists", "analytics")),
+)
+
+_METODOS_ESCRITA = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Respostas em streaming: guardar exigiria juntar o corpo inteiro em memória
+_SEM_CACHE = ("/api/checklists/stream",)
+
+
+class _Entrada(NamedTuple):
+    expira_em: float
+    corpo: bytes
+    content_type: str
+
+
+class CacheRespostas:
+    """
+    Guarda respostas por chave com expiração. Entradas vencidas não são
+    apagadas na hora: continuam disponíveis como fallback se o banco falhar,
+    até saírem pelo limite de `max_itens` (a menos usada sai primeiro).
+    """
+
+    def __init__(self, max_itens: int = 1024):
+        self._max_itens = max_itens
+        self._itens: "OrderedDict[str, _Entrada]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave: str) -> Tuple[Optional[_Entrada], bool]:
+        """Retorna (entrada, ainda_valida). Entrada None se não houver nada guardado."""
+        with self._lock:
+            entrada = self._itens.get(chave)
+            if entrada is None:
+                return None, False
+            self._itens.move_to_end(chave)
+            return entrada, entrada.expira_em > time.monotonic()
+
+    def guardar(self, chave: str, corpo: bytes, content_type: str, ttl: float) -> None:
+        with self._lock:
+            self._itens[chave] = _Entrada(time.monotonic() + ttl, corpo, content_type)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self._max_itens:
+                self._itens.popitem(last=False)
+
+    def invalidar(self, *grupos: str) -> None:
+        """Remove todas as entradas dos grupos informados."""
+        prefixos = tuple(f"{g}:" for g in grupos)
+        with self._lock:
+            for chave in [c for c in self._itens if c.startswith(prefixos)]:
+                del self._itens[chave]
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+
+
+cache_respostas = CacheRespostas()
+
+
+def _politica(path: str) -> Optional[Tuple[str, float]]:
+    if path.startswith(_SEM_CACHE):
+        return None
+    for prefixo, grupo, ttl in _POLITICAS:
+        if path.startswith(prefixo):
+            return grupo, ttl
+    return None
+
+
+def _grupos_invalidados(path: str) -> Tuple[str, ...]:
+    for prefixo, grupos in _INVALIDACOES:
+        if path.startswith(prefixo):
+            return grupos
+    return ()
+
+
+def _chave(request: Request, grupo: str) -> str:
+    """
+    (grupo, path, query ordenada, credencial). A credencial entra como hash:
+    só respostas 200 são guardadas, então um token inválido nunca recebe
+    o que foi cacheado para outro.
+    """
+    query = urlencode(sorted(request.query_params.multi_items()))
+    credencial = hashlib.sha256(request.headers.get("authorization", "").encode()).hexdigest()[:16]
+    return f"{grupo}:{request.url.path}?{query}:{credencial}"
+
+
+def _credencial_valida(request: Request) -> bool:
+    """
+    Mesmo critério do get_current_user, sem ir ao banco: token válido e não
+    expirado, e usuário ativo no cache de usuários. Na dúvida (ex: usuário fora
+    do cache), responde False e a requisição segue para a rota.
+    """
+    esquema, _, token = request.headers.get("authorization", "").partition(" ")
+    if esquema.lower() != "bearer" or not token:
+        return False
+    payload = decode_access_token(token)
+    if payload is None or payload.get("sub") is None:
+        return False
+    usuario = cache_usuarios.obter(payload["sub"])
+    return usuario is not None and usuario.is_active
+
+
+def _resposta_do_cache(entrada: _Entrada, origem: str) -> Response:
+    return Response(
+        entrada.corpo,
+        headers={"content-type": entrada.content_type, "X-Cache": origem},
+    )
+
+
+class CacheRespostasMiddleware(BaseHTTPMiddleware):
+    """Aplica o cache_respostas aos GETs configurados e invalida nas escritas."""
+
+    async def dispatch(self, request: Request, call_next):
+        path = request.url.path
+
+        if request.method in _METODOS_ESCRITA:
+            resposta = await call_next(request)
+            grupos = _grupos_invalidados(path)
+            if grupos and resposta.status_code < 400:
+                cache_respostas.invalidar(*grupos)
+            return resposta
+
+        politica = _politica(path) if request.method == "GET" else None
+        if politica is None:
+            return await call_next(request)
+
+        grupo, ttl = politica
+        chave = _chave(request, grupo)
+        entrada, valida = cache_respostas.obter(chave)
+        if entrada is not None and not _credencial_valida(request):
+            # Token expirado / usuário inativo: a rota decide (401/403), sem cache
+            return await call_next(request)
+        if valida:
+            return _resposta_do_cache(entrada, "HIT")
+
+        try:
+            resposta = await call_next(request)
+        except Exception:
+            # Banco fora do ar etc.: melhor uma resposta um pouco velha do que um erro
+            if entrada is not None:
+                return _resposta_do_cache(entrada, "STALE")
+            raise
+
+        if resposta.status_code >= 500 and entrada is not None:
+            return _resposta_do_cache(entrada, "STALE")
+        if resposta.status_code != 200:
+            return resposta
+
+        corpo = b"".join([parte async for parte in resposta.body_iterator])
+        cache_respostas.guardar(
+            chave, corpo, resposta.headers.get("content-type", "application/json"), ttl
+        )
+        headers = dict(resposta.headers)
+        headers["X-Cache"] = "MISS"
+        return Response(corpo, status_code=resposta.status_code, headers=headers)
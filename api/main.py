@@ -1,22 +1,25 @@
 # api/main.py
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
+from fastapi.middleware.gzip import GZipMiddleware
+from collections import OrderedDict, defaultdict
+from functools import wraps
+from typing import Any, Dict, List, Optional
 from datetime import date
 
 from controle.oficina_controller import OficinaController
 from controle.excecoes import (
     MotoNaoEncontradaError,
     ChecklistNaoEncontradoError,
-    ItemChecklistNaoEncontradoError,
     ValidacaoError
 )
-from controle.validadores import normalizar_placa, validar_placa_brasileira
+from controle.validadores import normalizar_placa, normalizar_e_validar
 from analytics.oficina_analytics import OficinaAnalytics
+from api.orjson_response import ORJSONResponse, ORJSONListaStreamingResponse
 from modelo.moto import Moto
-from modelo.categoria_moto import CategoriaMoto
+from modelo.categoria_moto import CategoriaMoto, CATEGORIA_POR_CHAVE
 from modelo.checklist import Checklist
-from modelo.checklist_item import ChecklistItem, StatusItem
+from modelo.checklist_item import ChecklistItem, StatusItem, status_por_texto
 from modelo.checklist_templates import criar_checklist_padrao, criar_checklist_adaptativo
 from api.schemas import (
     MotoCreate, MotoUpdate, MotoResponse,
@@ -28,7 +31,8 @@ from api.schemas import (
 app = FastAPI(
     title="Oficina Vital API",
     description="API REST para gerenciamento de oficina de motos",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Configurar CORS para permitir requisições do React
@@ -40,15 +44,75 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compacta respostas maiores (listas de motos/checklists repetem muito as mesmas chaves)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Instâncias globais (em produção, usar injeção de dependência)
+# Os endpoints são async: o controller é em memória (sem I/O), então as chamadas
+# rodam direto no event loop, sem passar pelo threadpool do FastAPI. Isso também
+# serializa o acesso às listas do controller, que não é thread-safe.
 controller = OficinaController()
 analytics = OficinaAnalytics(controller)
 
+# Cache das respostas de GET, válido enquanto a versão dos dados do controller
+# não mudar (qualquer cadastro/alteração/remoção invalida tudo de uma vez).
+# A chave vem dos parâmetros da requisição: limitado, a menos usada sai primeiro
+_MAX_RESPOSTAS_EM_CACHE = 256
+_cache_respostas: Dict[str, Any] = {"versao": None, "itens": OrderedDict()}
+
+
+def cache_por_versao(func):
+    """
+    Decorator para endpoints GET: reaproveita a resposta para os mesmos
+    parâmetros até que os dados do controller sejam alterados.
+    Erros (HTTPException) e respostas em streaming não são guardados.
+    """
+    @wraps(func)
+    async def wrapper(**kwargs):
+        if _cache_respostas["versao"] != controller.versao:
+            _cache_respostas["versao"] = controller.versao
+            _cache_respostas["itens"] = OrderedDict()
+
+        chave = (func.__name__, tuple(sorted(kwargs.items())))
+        itens = _cache_respostas["itens"]
+        resposta = itens.get(chave)
+        if resposta is not None:
+            itens.move_to_end(chave)
+            return resposta
+
+        resposta = await func(**kwargs)
+        # Streaming só pode ser enviado uma vez
+        if not isinstance(resposta, ORJSONListaStreamingResponse):
+            itens[chave] = resposta
+            while len(itens) > _MAX_RESPOSTAS_EM_CACHE:
+                itens.popitem(last=False)
+        return resposta
+    return wrapper
+
 
 # ==================== ENDPOINTS DE MOTOS ====================
 
-@app.get("/api/motos", response_model=List[MotoResponse], tags=["Motos"])
-def listar_motos(
+# Nos endpoints de listagem a resposta já sai pronta em ORJSONResponse, sem
+# revalidar cada item pelo response_model (o schema segue documentado em `responses`).
+# Listas acima deste tamanho são enviadas em streaming, item a item.
+_LIMITE_LISTA_SEM_STREAMING = 1000
+
+
+def _resposta_lista(objetos: List[Any]):
+    """Serializa uma lista de motos/checklists (via to_dict) na resposta adequada ao tamanho."""
+    if len(objetos) > _LIMITE_LISTA_SEM_STREAMING:
+        return ORJSONListaStreamingResponse(o.to_dict() for o in objetos)
+    return ORJSONResponse([o.to_dict() for o in objetos])
+
+
+@app.get(
+    "/api/motos",
+    response_model=None,
+    responses={200: {"model": List[MotoResponse]}},
+    tags=["Motos"]
+)
+@cache_por_versao
+async def listar_motos(
     skip: int = 0,
     limit: Optional[int] = None,
     ordenar_por: Optional[str] = None
@@ -59,31 +123,12 @@ def listar_motos(
     - limit: Número máximo de registros a retornar (padrão: todos)
     - ordenar_por: Campo para ordenação (placa, modelo, ano, marca)
     """
-    motos = controller.listar_motos()
-    
-    # Ordenação
-    if ordenar_por:
-        ordenar_por = ordenar_por.lower()
-        if ordenar_por == "placa":
-            motos = sorted(motos, key=lambda m: m.placa)
-        elif ordenar_por == "modelo":
-            motos = sorted(motos, key=lambda m: m.modelo)
-        elif ordenar_por == "ano":
-            motos = sorted(motos, key=lambda m: m.ano, reverse=True)
-        elif ordenar_por == "marca":
-            motos = sorted(motos, key=lambda m: m.marca)
-    
-    # Paginação
-    if limit:
-        motos = motos[skip:skip + limit]
-    else:
-        motos = motos[skip:]
-    
-    return [m.to_dict() for m in motos]
+    motos = controller.listar_motos(skip=skip, limit=limit, ordenar_por=ordenar_por)
+    return _resposta_lista(motos)
 
 
 @app.get("/api/motos/{placa}", response_model=MotoResponse, tags=["Motos"])
-def buscar_moto_por_placa(placa: str):
+async def buscar_moto_por_placa(placa: str):
     """Busca uma moto pela placa."""
     try:
         moto = controller.buscar_moto_por_placa(placa)
@@ -95,31 +140,29 @@ def buscar_moto_por_placa(placa: str):
         )
 
 
-@app.get("/api/motos/buscar/modelo", response_model=List[MotoResponse], tags=["Motos"])
-def buscar_motos_por_modelo(termo: str):
+@app.get(
+    "/api/motos/buscar/modelo",
+    response_model=None,
+    responses={200: {"model": List[MotoResponse]}},
+    tags=["Motos"]
+)
+async def buscar_motos_por_modelo(termo: str):
     """Busca motos por modelo (busca parcial, case-insensitive)."""
     motos = controller.buscar_motos_por_modelo(termo)
-    return [m.to_dict() for m in motos]
+    return _resposta_lista(motos)
 
 
 @app.post("/api/motos", response_model=MotoResponse, status_code=status.HTTP_201_CREATED, tags=["Motos"])
-def cadastrar_moto(moto_data: MotoCreate):
+async def cadastrar_moto(moto_data: MotoCreate):
     """Cadastra uma nova moto."""
     try:
         # Valida placa
-        valida, msg_erro = validar_placa_brasileira(moto_data.placa)
-        if not valida:
+        _, msg_erro = normalizar_e_validar(moto_data.placa)
+        if msg_erro:
             raise ValidacaoError(msg_erro)
         
         # Converte categoria string para enum
-        categoria_enum = None
-        for cat in CategoriaMoto:
-            if cat.value == moto_data.categoria or cat.name == moto_data.categoria:
-                categoria_enum = cat
-                break
-        
-        if categoria_enum is None:
-            categoria_enum = CategoriaMoto.OUTROS
+        categoria_enum = CATEGORIA_POR_CHAVE.get(moto_data.categoria, CategoriaMoto.OUTROS)
 
         moto = Moto(
             placa=moto_data.placa,
@@ -140,10 +183,11 @@ def cadastrar_moto(moto_data: MotoCreate):
 
 
 @app.put("/api/motos/{placa}", response_model=MotoResponse, tags=["Motos"])
-def atualizar_moto(placa: str, moto_data: MotoUpdate):
+async def atualizar_moto(placa: str, moto_data: MotoUpdate):
     """Atualiza os dados de uma moto existente."""
     try:
         moto = controller.buscar_moto_por_placa(placa)
+        controller.notificar_alteracao()
         
         # Atualiza apenas os campos fornecidos
         if moto_data.marca is not None:
@@ -155,10 +199,9 @@ def atualizar_moto(placa: str, moto_data: MotoUpdate):
         if moto_data.cilindradas is not None:
             moto._set_cilindradas(moto_data.cilindradas)
         if moto_data.categoria is not None:
-            for cat in CategoriaMoto:
-                if cat.value == moto_data.categoria or cat.name == moto_data.categoria:
-                    moto._categoria = cat
-                    break
+            categoria_enum = CATEGORIA_POR_CHAVE.get(moto_data.categoria)
+            if categoria_enum is not None:
+                moto._categoria = categoria_enum
         
         return moto.to_dict()
     except MotoNaoEncontradaError:
@@ -174,7 +217,7 @@ def atualizar_moto(placa: str, moto_data: MotoUpdate):
 
 
 @app.delete("/api/motos/{placa}", status_code=status.HTTP_204_NO_CONTENT, tags=["Motos"])
-def deletar_moto(placa: str):
+async def deletar_moto(placa: str):
     """Remove uma moto do sistema."""
     sucesso = controller.deletar_moto(placa)
     if not sucesso:
@@ -187,8 +230,14 @@ def deletar_moto(placa: str):
 
 # ==================== ENDPOINTS DE CHECKLISTS ====================
 
-@app.get("/api/checklists", response_model=List[ChecklistResponse], tags=["Checklists"])
-def listar_checklists(
+@app.get(
+    "/api/checklists",
+    response_model=None,
+    responses={200: {"model": List[ChecklistResponse]}},
+    tags=["Checklists"]
+)
+@cache_por_versao
+async def listar_checklists(
     data_inicio: Optional[date] = None,
     data_fim: Optional[date] = None,
     status_item: Optional[str] = None,
@@ -207,60 +256,47 @@ def listar_checklists(
     - limit: Número máximo de registros a retornar (padrão: todos)
     - ordenar_por: Campo para ordenação (data, km, custo)
     """
-    if placa:
-        checklists = controller.get_checklists_por_moto(placa)
-    elif data_inicio or data_fim:
-        checklists = controller.buscar_checklists_por_periodo(data_inicio, data_fim)
-    elif status_item:
-        status_enum = None
-        for s in StatusItem:
-            if s.value == status_item.lower() or s.name == status_item.upper():
-                status_enum = s
-                break
+    status_enum = None
+    if status_item:
+        status_enum = status_por_texto(status_item)
         if status_enum is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Status inválido: {status_item}"
             )
-        checklists = controller.buscar_checklists_por_status_item(status_enum)
-    else:
-        checklists = controller.listar_checklists()
-    
-    # Ordenação
-    if ordenar_por:
-        ordenar_por = ordenar_por.lower()
-        if ordenar_por == "data":
-            checklists = sorted(checklists, key=lambda c: c.data_revisao, reverse=True)
-        elif ordenar_por == "km":
-            checklists = sorted(checklists, key=lambda c: c.km_atual, reverse=True)
-        elif ordenar_por == "custo":
-            checklists = sorted(checklists, key=lambda c: c.custo_total_estimado(), reverse=True)
-    
-    # Paginação
-    if limit:
-        checklists = checklists[skip:skip + limit]
-    else:
-        checklists = checklists[skip:]
+
+    checklists = controller.listar_checklists(
+        placa=placa,
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        status_item=status_enum,
+        skip=skip,
+        limit=limit,
+        ordenar_por=ordenar_por,
+    )
     
-    return [ch.to_dict() for ch in checklists]
+    return _resposta_lista(checklists)
 
 
-@app.get("/api/checklists/moto/{placa}", response_model=List[ChecklistResponse], tags=["Checklists"])
-def listar_checklists_por_moto(placa: str):
+@app.get(
+    "/api/checklists/moto/{placa}",
+    response_model=None,
+    responses={200: {"model": List[ChecklistResponse]}},
+    tags=["Checklists"]
+)
+async def listar_checklists_por_moto(placa: str):
     """Lista todos os checklists de uma moto específica."""
-    try:
-        controller.buscar_moto_por_placa(placa)  # Verifica se a moto existe
-        checklists = controller.get_checklists_por_moto(placa)
-        return [ch.to_dict() for ch in checklists]
-    except MotoNaoEncontradaError:
+    moto, checklists = controller.get_moto_e_checklists(placa)
+    if moto is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Moto com placa {placa} não encontrada."
         )
+    return _resposta_lista(checklists)
 
 
 @app.post("/api/checklists", response_model=ChecklistResponse, status_code=status.HTTP_201_CREATED, tags=["Checklists"])
-def criar_checklist(checklist_data: ChecklistCreate):
+async def criar_checklist(checklist_data: ChecklistCreate):
     """Cria um novo checklist de revisão."""
     try:
         # Busca ou cadastra a moto
@@ -283,11 +319,7 @@ def criar_checklist(checklist_data: ChecklistCreate):
             checklist._itens = []
             for item_data in checklist_data.itens:
                 # Converte status string para enum
-                status_enum = StatusItem.PENDENTE
-                for s in StatusItem:
-                    if s.value == item_data.status or s.name == item_data.status.upper():
-                        status_enum = s
-                        break
+                status_enum = status_por_texto(item_data.status) or StatusItem.PENDENTE
 
                 item = ChecklistItem(
                     nome=item_data.nome,
@@ -307,7 +339,7 @@ def criar_checklist(checklist_data: ChecklistCreate):
 
 
 @app.get("/api/checklists/{checklist_id}", response_model=ChecklistResponse, tags=["Checklists"])
-def buscar_checklist_por_id(checklist_id: int):
+async def buscar_checklist_por_id(checklist_id: int):
     """Busca um checklist pelo ID único."""
     try:
         checklist = controller.buscar_checklist_por_id(checklist_id)
@@ -322,7 +354,7 @@ def buscar_checklist_por_id(checklist_id: int):
 
 
 @app.put("/api/checklists/{checklist_id}", response_model=ChecklistResponse, tags=["Checklists"])
-def atualizar_checklist(checklist_id: int, checklist_data: ChecklistUpdate):
+async def atualizar_checklist(checklist_id: int, checklist_data: ChecklistUpdate):
     """Atualiza um checklist existente."""
     checklist = controller.buscar_checklist_por_id(checklist_id)
     if not checklist:
@@ -342,46 +374,44 @@ def atualizar_checklist(checklist_id: int, checklist_data: ChecklistUpdate):
     if checklist_data.data_revisao is not None:
         checklist._data_revisao = checklist_data.data_revisao
     
+    controller.notificar_alteracao()
     return checklist.to_dict()
 
 
 @app.put("/api/checklists/{checklist_id}/itens/{item_index}", response_model=ChecklistResponse, tags=["Checklists"])
-def atualizar_item_checklist(
+async def atualizar_item_checklist(
     checklist_id: int, 
     item_index: int,
-    status: Optional[str] = None,
+    status_item: Optional[str] = Query(None, alias="status"),
     custo_estimado: Optional[float] = None
 ):
     """Atualiza um item específico de um checklist."""
-    # Converte status string para enum
+    # Converte status string para enum (o parâmetro continua se chamando "status"
+    # na URL; o nome interno evita esconder o módulo `status` do FastAPI)
     status_enum = None
-    if status:
-        for s in StatusItem:
-            if s.value == status or s.name == status.upper():
-                status_enum = s
-                break
+    if status_item:
+        status_enum = status_por_texto(status_item)
         if status_enum is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Status inválido: {status}"
+                detail=f"Status inválido: {status_item}"
             )
     
-    sucesso = controller.atualizar_item_checklist(
+    checklist = controller.atualizar_item_checklist(
         checklist_id, item_index, status_enum, custo_estimado
     )
     
-    if not sucesso:
+    if checklist is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Checklist ou item não encontrado."
         )
     
-    checklist = controller.buscar_checklist_por_id(checklist_id)
     return checklist.to_dict()
 
 
 @app.delete("/api/checklists/{checklist_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Checklists"])
-def deletar_checklist(checklist_id: int):
+async def deletar_checklist(checklist_id: int):
     """Remove um checklist do sistema."""
     sucesso = controller.deletar_checklist_por_id(checklist_id)
     if not sucesso:
@@ -395,7 +425,8 @@ def deletar_checklist(checklist_id: int):
 # ==================== ENDPOINTS DE ANALYTICS ====================
 
 @app.get("/api/analytics", response_model=AnalyticsResponse, tags=["Analytics"])
-def obter_analytics(
+@cache_por_versao
+async def obter_analytics(
     km_futuro: Optional[int] = None,
     placa: Optional[str] = None,
     data_inicio: Optional[date] = None,
@@ -408,41 +439,24 @@ def obter_analytics(
     - data_inicio: Filtrar por período (data início)
     - data_fim: Filtrar por período (data fim)
     """
-    # Se há filtros, criar analytics temporário com dados filtrados
+    # Se há filtros, analisa só os checklists filtrados
     if placa or data_inicio or data_fim:
-        from analytics.oficina_analytics import OficinaAnalytics
-        from controle.oficina_controller import OficinaController
-        
-        # Cria controller temporário com dados filtrados
-        temp_controller = OficinaController()
-        
-        # Obtém checklists filtrados
-        if placa:
-            checklists_filtrados = controller.get_checklists_por_moto(placa)
-        elif data_inicio or data_fim:
-            checklists_filtrados = controller.buscar_checklists_por_periodo(data_inicio, data_fim)
-        else:
-            checklists_filtrados = controller.listar_checklists()
-        
-        # Adiciona checklists filtrados ao controller temporário
-        for ch in checklists_filtrados:
-            temp_controller._checklists.append(ch)
-        
-        temp_analytics = OficinaAnalytics(temp_controller)
-        resumo = temp_analytics.resumo_custos()
-        distribuicao = temp_analytics.distribuicao_status_itens()
-        modelo = temp_analytics.estimar_custo_por_km()
+        checklists_filtrados = controller.listar_checklists(
+            placa=placa,
+            data_inicio=data_inicio,
+            data_fim=data_fim
+        )
+        fonte = OficinaAnalytics(checklists_filtrados)
     else:
-        resumo = analytics.resumo_custos()
-        distribuicao = analytics.distribuicao_status_itens()
-        modelo = analytics.estimar_custo_por_km()
+        fonte = analytics
+    
+    resumo = fonte.resumo_custos()
+    distribuicao = fonte.distribuicao_status_itens()
+    modelo = fonte.estimar_custo_por_km()
     
     previsao = None
     if km_futuro is not None and modelo is not None:
-        if placa or data_inicio or data_fim:
-            previsao = temp_analytics.prever_custo_para_km(km_futuro)
-        else:
-            previsao = analytics.prever_custo_para_km(km_futuro)
+        previsao = fonte.prever_custo_para_km(km_futuro)
     
     return {
         "resumo_custos": resumo,
@@ -453,19 +467,12 @@ def obter_analytics(
 
 
 @app.get("/api/analytics/previsao/{km}", tags=["Analytics"])
-def prever_custo_por_km(km: int, placa: Optional[str] = None):
+@cache_por_versao
+async def prever_custo_por_km(km: int, placa: Optional[str] = None):
     """Prevê o custo estimado para uma quilometragem futura."""
     if placa:
         # Analytics apenas para a moto específica
-        from analytics.oficina_analytics import OficinaAnalytics
-        from controle.oficina_controller import OficinaController
-        
-        temp_controller = OficinaController()
-        checklists_filtrados = controller.get_checklists_por_moto(placa)
-        for ch in checklists_filtrados:
-            temp_controller._checklists.append(ch)
-        
-        temp_analytics = OficinaAnalytics(temp_controller)
+        temp_analytics = OficinaAnalytics(controller.get_checklists_por_moto(placa))
         previsao = temp_analytics.prever_custo_para_km(km)
     else:
         previsao = analytics.prever_custo_para_km(km)
@@ -479,19 +486,28 @@ def prever_custo_por_km(km: int, placa: Optional[str] = None):
 
 
 @app.get("/api/analytics/categoria", tags=["Analytics"])
-def obter_analytics_por_categoria():
+@cache_por_versao
+async def obter_analytics_por_categoria():
     """Retorna estatísticas agrupadas por categoria de moto."""
-    from modelo.categoria_moto import CategoriaMoto
-    from analytics.oficina_analytics import OficinaAnalytics
-    from controle.oficina_controller import OficinaController
+    # Uma passada só: agrupa motos e checklists por categoria
+    motos_por_categoria = defaultdict(int)
+    categoria_por_placa = {}
+    for m in controller.listar_motos():
+        motos_por_categoria[m.categoria] += 1
+        categoria_por_placa[normalizar_placa(m.placa)] = m.categoria
+    
+    checklists_por_categoria = defaultdict(list)
+    for ch in controller.listar_checklists():
+        categoria = categoria_por_placa.get(normalizar_placa(ch.moto.placa))
+        if categoria is not None:
+            checklists_por_categoria[categoria].append(ch)
     
     resultado = {}
     
     for categoria in CategoriaMoto:
-        # Filtra motos por categoria
-        motos_categoria = [m for m in controller.listar_motos() if m.categoria == categoria]
+        total_motos = motos_por_categoria.get(categoria, 0)
         
-        if not motos_categoria:
+        if not total_motos:
             resultado[categoria.value] = {
                 "total_motos": 0,
                 "resumo_custos": {"soma": 0.0, "media": 0.0, "max": 0.0, "min": 0.0},
@@ -499,21 +515,12 @@ def obter_analytics_por_categoria():
             }
             continue
         
-        # Obtém checklists dessas motos
-        temp_controller = OficinaController()
-        placas_categoria = {m.placa for m in motos_categoria}
-        
-        for ch in controller.listar_checklists():
-            if normalizar_placa(ch.moto.placa) in {normalizar_placa(p) for p in placas_categoria}:
-                temp_controller._checklists.append(ch)
-        
-        temp_analytics = OficinaAnalytics(temp_controller)
-        resumo = temp_analytics.resumo_custos()
+        checklists_categoria = checklists_por_categoria.get(categoria, [])
         
         resultado[categoria.value] = {
-            "total_motos": len(motos_categoria),
-            "resumo_custos": resumo,
-            "total_checklists": len(temp_controller.listar_checklists())
+            "total_motos": total_motos,
+            "resumo_custos": analytics.resumo_custos(checklists_categoria),
+            "total_checklists": len(checklists_categoria)
         }
     
     return resultado
@@ -521,18 +528,23 @@ def obter_analytics_por_categoria():
 
 # ==================== HEALTH CHECK ====================
 
+# Respostas fixas: montadas uma vez só, já que os probes chamam com frequência
+_RESPOSTA_ROOT = {
+    "message": "Oficina Vital API",
+    "version": app.version,
+    "status": "online"
+}
+_RESPOSTA_HEALTH = {"status": "healthy"}
+
+
 @app.get("/", tags=["Health"])
-def root():
+async def root():
     """Endpoint raiz - health check."""
-    return {
-        "message": "Oficina Vital API",
-        "version": "1.0.0",
-        "status": "online"
-    }
+    return _RESPOSTA_ROOT
 
 
 @app.get("/health", tags=["Health"])
-def health():
+async def health():
     """Health check endpoint."""
-    return {"status": "healthy"}
+    return _RESPOSTA_HEALTH
 
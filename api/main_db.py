@@ -2,25 +2,31 @@
 """
 API FastAPI com suporte a PostgreSQL, autenticação e logging.
 """
-from fastapi import FastAPI, HTTPException, status, Depends
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
+from fastapi import FastAPI, HTTPException, Query, status, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from typing import List, Optional
 from datetime import date
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
 
-from database import get_db, init_db
+from config import settings
+from database import engine, get_db, init_db
 from controle.oficina_controller_db import OficinaControllerDB
 from controle.excecoes import (
     MotoNaoEncontradaError,
     ChecklistNaoEncontradoError,
     ValidacaoError
 )
-from controle.validadores import normalizar_placa, validar_placa_brasileira
-from analytics.oficina_analytics import OficinaAnalytics
+from controle.validadores import normalizar_placa, normalizar_e_validar
+from analytics.oficina_analytics import OficinaAnalytics, MemoAnalytics
 from modelo.moto import Moto
-from modelo.categoria_moto import CategoriaMoto
+from modelo.categoria_moto import CategoriaMoto, CATEGORIA_POR_CHAVE
 from modelo.checklist import Checklist
-from modelo.checklist_item import StatusItem
+from modelo.checklist_item import ChecklistItem, StatusItem, status_por_texto
 from modelo.checklist_templates import criar_checklist_padrao, criar_checklist_adaptativo
 from api.schemas import (
     MotoCreate, MotoUpdate, MotoResponse,
@@ -29,21 +35,56 @@ from api.schemas import (
     AnalyticsResponse
 )
 from api.auth import router as auth_router
+from api.orjson_response import ORJSONResponse, ORJSONLinhasStreamingResponse
+from api.cache_respostas import CacheRespostasMiddleware, cache_respostas
 from auth.dependencies import get_current_active_user, get_current_admin_user
 from db.models import UsuarioDB
+from db.resumos import atualizador_resumos
 from utils.logger import logger
 
-# Inicializa banco de dados
-init_db()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup/shutdown da API. As tabelas são criadas aqui (não na importação
+    do módulo), numa thread para não travar o event loop.
+
+    Os endpoints são síncronos (Session do SQLAlchemy) e rodam no threadpool
+    do AnyIO, limitado a 40 threads por padrão. O limite acompanha o pool de
+    conexões para que cada requisição em espera tenha uma conexão disponível.
+    """
+    if settings.DB_CREATE_ALL:
+        await anyio.to_thread.run_sync(init_db)
+
+    limite = anyio.to_thread.current_default_thread_limiter()
+    limite.total_tokens = settings.THREADPOOL_WORKERS or (
+        settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    )
+
+    # Visão financeiro_diario (PostgreSQL): um refresh no startup cobre escritas
+    # cujo refresh agendado se perdeu; depois de cada refresh, o /api/financeiro
+    # guardado no cache de respostas deixa de valer
+    atualizador_resumos.ao_atualizar = lambda: cache_respostas.invalidar("analytics")
+    atualizador_resumos.agendar()
+    yield
+    atualizador_resumos.cancelar()
+    engine.dispose()
+
 
 app = FastAPI(
+    lifespan=lifespan,
     title="Oficina Vital API",
     description="API REST para gerenciamento de oficina de motos com PostgreSQL",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
+# Cache das respostas GET (motos, checklists, analytics, financeiro).
+# Adicionado antes do CORS = mais interno: respostas do cache (HIT/STALE)
+# também passam pelo CORSMiddleware e recebem os cabeçalhos de CORS.
+app.add_middleware(CacheRespostasMiddleware)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -53,25 +94,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compacta respostas maiores (listas de motos/checklists repetem muito as mesmas chaves).
+# Adicionado por último = mais externo: o cache guarda o corpo sem compressão e
+# cada cliente recebe conforme o seu Accept-Encoding.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Inclui rotas de autenticação
 app.include_router(auth_router)
 
 
+# Dependências leves (só instanciam objetos): `async def` roda direto no event
+# loop, sem a ida ao threadpool que o FastAPI faz para dependências `def`.
+# O controller é resolvido uma vez por requisição, mesmo se pedido duas vezes.
+
 # Dependency para obter controller com sessão do banco
-def get_controller(db: Session = Depends(get_db)) -> OficinaControllerDB:
+async def get_controller(db: Session = Depends(get_db)) -> OficinaControllerDB:
     """Retorna uma instância do controller com sessão do banco."""
     return OficinaControllerDB(db)
 
 
+# Resultados do analytics (resumo, distribuição, regressão) compartilhados entre
+# requisições; valem enquanto OficinaControllerDB.versao não mudar
+memo_analytics = MemoAnalytics()
+
+
 # Dependency para analytics
-def get_analytics(controller: OficinaControllerDB = Depends(get_controller)) -> OficinaAnalytics:
+async def get_analytics(controller: OficinaControllerDB = Depends(get_controller)) -> OficinaAnalytics:
     """Retorna instância de analytics."""
-    return OficinaAnalytics(controller)
+    return OficinaAnalytics(controller, memo=memo_analytics)
 
 
 # ==================== ENDPOINTS DE MOTOS ====================
 
-@app.get("/api/motos", response_model=List[MotoResponse], tags=["Motos"])
+# Nos endpoints de listagem o to_dict() já tem o formato do schema: a lista sai
+# direto em ORJSONResponse, sem revalidar cada item pelo response_model
+# (o schema segue documentado em `responses`).
+
+@app.get(
+    "/api/motos",
+    response_model=None,
+    responses={200: {"model": List[MotoResponse]}},
+    tags=["Motos"]
+)
 def listar_motos(
     skip: int = 0,
     limit: Optional[int] = None,
@@ -81,27 +145,8 @@ def listar_motos(
 ):
     """Lista todas as motos cadastradas com paginação e ordenação."""
     logger.info(f"Listando motos - usuário: {current_user.username}")
-    motos = controller.listar_motos()
-    
-    # Ordenação
-    if ordenar_por:
-        ordenar_por = ordenar_por.lower()
-        if ordenar_por == "placa":
-            motos = sorted(motos, key=lambda m: m.placa)
-        elif ordenar_por == "modelo":
-            motos = sorted(motos, key=lambda m: m.modelo)
-        elif ordenar_por == "ano":
-            motos = sorted(motos, key=lambda m: m.ano, reverse=True)
-        elif ordenar_por == "marca":
-            motos = sorted(motos, key=lambda m: m.marca)
-    
-    # Paginação
-    if limit:
-        motos = motos[skip:skip + limit]
-    else:
-        motos = motos[skip:]
-    
-    return [m.to_dict() for m in motos]
+    motos = controller.listar_motos(skip=skip, limit=limit, ordenar_por=ordenar_por)
+    return ORJSONResponse([m.to_dict() for m in motos])
 
 
 @app.get("/api/motos/{placa}", response_model=MotoResponse, tags=["Motos"])
@@ -121,7 +166,12 @@ def buscar_moto_por_placa(
         )
 
 
-@app.get("/api/motos/buscar/modelo", response_model=List[MotoResponse], tags=["Motos"])
+@app.get(
+    "/api/motos/buscar/modelo",
+    response_model=None,
+    responses={200: {"model": List[MotoResponse]}},
+    tags=["Motos"]
+)
 def buscar_motos_por_modelo(
     termo: str,
     controller: OficinaControllerDB = Depends(get_controller),
@@ -129,7 +179,7 @@ def buscar_motos_por_modelo(
 ):
     """Busca motos por modelo (busca parcial, case-insensitive)."""
     motos = controller.buscar_motos_por_modelo(termo)
-    return [m.to_dict() for m in motos]
+    return ORJSONResponse([m.to_dict() for m in motos])
 
 
 @app.post("/api/motos", response_model=MotoResponse, status_code=status.HTTP_201_CREATED, tags=["Motos"])
@@ -141,19 +191,12 @@ def cadastrar_moto(
     """Cadastra uma nova moto."""
     try:
         # Valida placa
-        valida, msg_erro = validar_placa_brasileira(moto_data.placa)
-        if not valida:
+        _, msg_erro = normalizar_e_validar(moto_data.placa)
+        if msg_erro:
             raise ValidacaoError(msg_erro)
         
         # Converte categoria string para enum
-        categoria_enum = None
-        for cat in CategoriaMoto:
-            if cat.value == moto_data.categoria or cat.name == moto_data.categoria:
-                categoria_enum = cat
-                break
-        
-        if categoria_enum is None:
-            categoria_enum = CategoriaMoto.OUTROS
+        categoria_enum = CATEGORIA_POR_CHAVE.get(moto_data.categoria, CategoriaMoto.OUTROS)
 
         moto = Moto(
             placa=moto_data.placa,
@@ -232,7 +275,12 @@ def deletar_moto(
 
 # ==================== ENDPOINTS DE CHECKLISTS ====================
 
-@app.get("/api/checklists", response_model=List[ChecklistResponse], tags=["Checklists"])
+@app.get(
+    "/api/checklists",
+    response_model=None,
+    responses={200: {"model": List[ChecklistResponse]}},
+    tags=["Checklists"]
+)
 def listar_checklists(
     data_inicio: Optional[date] = None,
     data_fim: Optional[date] = None,
@@ -247,60 +295,95 @@ def listar_checklists(
     current_user: UsuarioDB = Depends(get_current_active_user)
 ):
     """Lista checklists com filtros opcionais, paginação e ordenação."""
-    if placa:
-        checklists = controller.get_checklists_por_moto(placa)
-    elif data_inicio or data_fim:
-        checklists = controller.buscar_checklists_por_periodo(data_inicio, data_fim)
-    elif status_item:
-        status_enum = None
-        for s in StatusItem:
-            if s.value == status_item.lower() or s.name == status_item.upper():
-                status_enum = s
-                break
+    status_enum = None
+    if status_item:
+        status_enum = status_por_texto(status_item)
         if status_enum is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Status inválido: {status_item}"
             )
-        checklists = controller.buscar_checklists_por_status_item(status_enum)
-    else:
-        checklists = controller.listar_checklists(finalizado=finalizado, pago=pago)
     
-    # Ordenação
-    if ordenar_por:
-        ordenar_por = ordenar_por.lower()
-        if ordenar_por == "data":
-            checklists = sorted(checklists, key=lambda c: c.data_revisao, reverse=True)
-        elif ordenar_por == "km":
-            checklists = sorted(checklists, key=lambda c: c.km_atual, reverse=True)
-        elif ordenar_por == "custo":
-            checklists = sorted(checklists, key=lambda c: c.custo_total_estimado(), reverse=True)
+    # Filtros, ordenação e paginação vão direto para a query (ORDER BY/OFFSET/LIMIT)
+    checklists = controller.listar_checklists(
+        finalizado=finalizado,
+        pago=pago,
+        placa=placa,
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        status_item=status_enum,
+        skip=skip,
+        limit=limit,
+        ordenar_por=ordenar_por
+    )
     
-    # Paginação
-    if limit:
-        checklists = checklists[skip:skip + limit]
-    else:
-        checklists = checklists[skip:]
+    return ORJSONResponse([ch.to_dict() for ch in checklists])
+
+
+@app.get(
+    "/api/checklists/stream",
+    response_model=None,
+    response_class=ORJSONLinhasStreamingResponse,
+    tags=["Checklists"]
+)
+def exportar_checklists_ndjson(
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    status_item: Optional[str] = None,
+    placa: Optional[str] = None,
+    finalizado: Optional[bool] = None,
+    pago: Optional[bool] = None,
+    ordenar_por: Optional[str] = None,
+    controller: OficinaControllerDB = Depends(get_controller),
+    current_user: UsuarioDB = Depends(get_current_active_user)
+):
+    """
+    Todos os checklists (mesmos filtros de /api/checklists, sem paginação) em
+    NDJSON: um checklist por linha, lidos do banco em lotes de 500 e enviados
+    conforme são serializados, sem montar a lista inteira em memória.
+    """
+    status_enum = None
+    if status_item:
+        status_enum = status_por_texto(status_item)
+        if status_enum is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Status inválido: {status_item}"
+            )
     
-    return [ch.to_dict() for ch in checklists]
+    logger.info(f"Exportando checklists (NDJSON) - usuário: {current_user.username}")
+    checklists = controller.iterar_checklists(
+        finalizado=finalizado,
+        pago=pago,
+        placa=placa,
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        status_item=status_enum,
+        ordenar_por=ordenar_por,
+        tamanho_lote=500
+    )
+    return ORJSONLinhasStreamingResponse(ch.to_dict() for ch in checklists)
 
 
-@app.get("/api/checklists/moto/{placa}", response_model=List[ChecklistResponse], tags=["Checklists"])
+@app.get(
+    "/api/checklists/moto/{placa}",
+    response_model=None,
+    responses={200: {"model": List[ChecklistResponse]}},
+    tags=["Checklists"]
+)
 def listar_checklists_por_moto(
     placa: str,
     controller: OficinaControllerDB = Depends(get_controller),
     current_user: UsuarioDB = Depends(get_current_active_user)
 ):
     """Lista todos os checklists de uma moto específica."""
-    try:
-        controller.buscar_moto_por_placa(placa)  # Verifica se a moto existe
-        checklists = controller.get_checklists_por_moto(placa)
-        return [ch.to_dict() for ch in checklists]
-    except MotoNaoEncontradaError:
+    if not controller.moto_existe(placa):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Moto com placa {placa} não encontrada."
         )
+    checklists = controller.get_checklists_por_moto(placa)
+    return ORJSONResponse([ch.to_dict() for ch in checklists])
 
 
 @app.post("/api/checklists", response_model=ChecklistResponse, status_code=status.HTTP_201_CREATED, tags=["Checklists"])
@@ -331,11 +414,7 @@ def criar_checklist(
             checklist._itens = []
             for item_data in checklist_data.itens:
                 # Converte status string para enum
-                status_enum = StatusItem.PENDENTE
-                for s in StatusItem:
-                    if s.value == item_data.status or s.name == item_data.status.upper():
-                        status_enum = s
-                        break
+                status_enum = status_por_texto(item_data.status) or StatusItem.PENDENTE
 
                 item = ChecklistItem(
                     nome=item_data.nome,
@@ -382,17 +461,7 @@ def atualizar_status_checklist(
     current_user: UsuarioDB = Depends(get_current_active_user)
 ):
     """Atualiza o status de finalização, pagamento e/ou custo real de um checklist."""
-    # Converte string "true"/"false" para boolean se necessário
-    if isinstance(finalizado, str):
-        finalizado = finalizado.lower() == 'true'
-    if isinstance(pago, str):
-        pago = pago.lower() == 'true'
-    if isinstance(custo_real, str):
-        try:
-            custo_real = float(custo_real) if custo_real else None
-        except ValueError:
-            custo_real = None
-    
+    # finalizado/pago/custo_real já chegam convertidos (ou 422) pelo FastAPI
     checklist = controller.atualizar_status_checklist(
         checklist_id=checklist_id,
         finalizado=finalizado,
@@ -411,23 +480,21 @@ def atualizar_status_checklist(
 def atualizar_item_checklist(
     checklist_id: int,
     item_index: int,
-    status: Optional[str] = None,
+    status_item: Optional[str] = Query(None, alias="status"),
     custo_estimado: Optional[float] = None,
     controller: OficinaControllerDB = Depends(get_controller),
     current_user: UsuarioDB = Depends(get_current_active_user)
 ):
     """Atualiza um item específico de um checklist."""
-    # Converte status string para enum
+    # Converte status string para enum (o parâmetro continua se chamando "status"
+    # na URL; o nome interno evita esconder o módulo `status` do FastAPI)
     status_enum = None
-    if status:
-        for s in StatusItem:
-            if s.value == status or s.name == status.upper():
-                status_enum = s
-                break
+    if status_item:
+        status_enum = status_por_texto(status_item)
         if status_enum is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Status inválido: {status}"
+                detail=f"Status inválido: {status_item}"
             )
     
     sucesso = controller.atualizar_item_checklist(
@@ -463,7 +530,12 @@ def deletar_checklist(
 
 # ==================== ENDPOINTS DE ANALYTICS ====================
 
-@app.get("/api/analytics", response_model=AnalyticsResponse, tags=["Analytics"])
+@app.get(
+    "/api/analytics",
+    response_model=None,
+    responses={200: {"model": AnalyticsResponse}},
+    tags=["Analytics"]
+)
 def obter_analytics(
     km_futuro: Optional[int] = None,
     placa: Optional[str] = None,
@@ -485,70 +557,29 @@ def obter_analytics(
     resumo_custos_reais = analytics.resumo_custos_reais()
     dados_historicos = analytics.dados_historicos_graficos()
     
-    return {
+    # Dicionário já pronto para JSON: serializa direto com orjson, sem
+    # validar pelo AnalyticsResponse nem passar pelo jsonable_encoder
+    return ORJSONResponse({
         "resumo_custos": resumo,
         "resumo_custos_reais": resumo_custos_reais,
         "distribuicao_status": distribuicao,
         "modelo_regressao": modelo,
         "previsao_custo_km": previsao,
         "dados_historicos": dados_historicos
-    }
+    })
 
 
-@app.get("/api/analytics/categoria", tags=["Analytics"])
+@app.get("/api/analytics/categoria", response_model=None, tags=["Analytics"])
 def obter_analytics_por_categoria(
     controller: OficinaControllerDB = Depends(get_controller),
     current_user: UsuarioDB = Depends(get_current_active_user)
 ):
     """Retorna estatísticas agrupadas por categoria de moto."""
-    from modelo.categoria_moto import CategoriaMoto
-    from analytics.oficina_analytics import OficinaAnalytics
-    
-    resultado = {}
-    
-    for categoria in CategoriaMoto:
-        # Filtra motos por categoria
-        motos_categoria = [m for m in controller.listar_motos() if m.categoria == categoria]
-        
-        if not motos_categoria:
-            resultado[categoria.value] = {
-                "total_motos": 0,
-                "resumo_custos": {"soma": 0.0, "media": 0.0, "max": 0.0, "min": 0.0},
-                "total_checklists": 0
-            }
-            continue
-        
-        # Obtém checklists dessas motos
-        temp_controller = controller  # Reutiliza o mesmo controller
-        placas_categoria = {m.placa for m in motos_categoria}
-        
-        checklists_categoria = []
-        for placa in placas_categoria:
-            checklists_categoria.extend(controller.get_checklists_por_moto(placa))
-        
-        # Cria analytics temporário usando controller em memória
-        from controle.oficina_controller import OficinaController
-        temp_controller_mem = OficinaController()
-        # Adiciona checklists ao controller temporário
-        for ch in checklists_categoria:
-            temp_controller_mem._checklists.append(ch)
-            # Atribui IDs temporários se necessário
-            if ch.id is None:
-                ch._id = len(temp_controller_mem._checklists)
-        
-        temp_analytics = OficinaAnalytics(temp_controller_mem)
-        resumo = temp_analytics.resumo_custos()
-        
-        resultado[categoria.value] = {
-            "total_motos": len(motos_categoria),
-            "resumo_custos": resumo,
-            "total_checklists": len(checklists_categoria)
-        }
-    
-    return resultado
+    # Uma query agrupada no banco, em vez de listar motos/checklists por categoria
+    return ORJSONResponse(controller.analytics_por_categoria())
 
 
-@app.get("/api/financeiro", tags=["Financeiro"])
+@app.get("/api/financeiro", response_model=None, tags=["Financeiro"])
 def obter_relatorio_financeiro(
     tipo_periodo: Optional[str] = None,
     data_inicio: Optional[date] = None,
@@ -580,13 +611,13 @@ def obter_relatorio_financeiro(
         )
     
     logger.info(f"Relatório financeiro gerado - usuário: {current_user.username}")
-    return relatorio
+    return ORJSONResponse(relatorio)
 
 
 # ==================== HEALTH CHECK ====================
 
 @app.get("/", tags=["Health"])
-def root():
+async def root():
     """Endpoint raiz - health check."""
     return {
         "message": "Oficina Vital API",
@@ -596,6 +627,21 @@ def root():
     }
 
 
+@app.get("/health/pool", tags=["Health"])
+async def estado_pool(current_user: UsuarioDB = Depends(get_current_admin_user)):
+    """Uso do pool de conexões, para ajustar DB_POOL_SIZE / DB_MAX_OVERFLOW (admin)."""
+    pool = engine.pool
+    estado = {"status": pool.status()}
+    if isinstance(pool, QueuePool):
+        estado.update({
+            "tamanho": pool.size(),
+            "em_uso": pool.checkedout(),
+            "livres": pool.checkedin(),
+            "overflow": pool.overflow(),
+        })
+    return estado
+
+
 @app.get("/health", tags=["Health"])
 def health(db: Session = Depends(get_db)):
     """Health check endpoint com verificação de banco."""
@@ -3,9 +3,13 @@
 API FastAPI para desenvolvimento local SEM banco de dados.
 Usa o controller em memória para testes rápidos.
 """
-from fastapi import FastAPI, HTTPException, status
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
+from fastapi.middleware.gzip import GZipMiddleware
+from functools import lru_cache
+from typing import Annotated, Any, List, Optional, Tuple
 from datetime import date
 
 from controle.oficina_controller import OficinaController
@@ -14,26 +18,52 @@ from controle.excecoes import (
     ChecklistNaoEncontradoError,
     ValidacaoError
 )
-from controle.validadores import normalizar_placa, validar_placa_brasileira
+from controle.validadores import normalizar_placa, normalizar_e_validar
 from analytics.oficina_analytics import OficinaAnalytics
 from modelo.moto import Moto
-from modelo.categoria_moto import CategoriaMoto
+from modelo.categoria_moto import CategoriaMoto, CATEGORIA_POR_CHAVE
 from modelo.checklist import Checklist
-from modelo.checklist_item import StatusItem
+from modelo.checklist_item import ChecklistItem, StatusItem, STATUS_POR_CHAVE, status_por_texto
 from modelo.checklist_templates import criar_checklist_padrao, criar_checklist_adaptativo
 from api.schemas import (
     MotoCreate, MotoUpdate, MotoResponse,
-    ChecklistCreate, ChecklistUpdate, ChecklistResponse,
+    ChecklistCreate, ChecklistUpdate, ChecklistStatusUpdate, ChecklistResponse,
     ChecklistItemCreate, ChecklistItemResponse,
     AnalyticsResponse
 )
+from api.orjson_response import ORJSONResponse, ORJSONListaStreamingResponse
+from utils.logger import logger
+
+# Instâncias globais (em memória)
+controller = OficinaController()
+analytics = OficinaAnalytics(controller)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup da API: popula os dados de exemplo e já calcula as métricas que
+    o analytics memoriza (resumo, distribuição de status e regressão; valem
+    até os dados mudarem), para a primeira requisição não pagar por elas.
+    """
+    from main import popular_dados_exemplo
+    popular_dados_exemplo(controller)
+    analytics.resumo_custos()
+    analytics.distribuicao_status_itens()
+    analytics.estimar_custo_por_km()
+    logger.info("API iniciada em modo local (sem banco de dados)")
+    logger.info("Dados de exemplo carregados")
+    yield
+
 
 app = FastAPI(
+    lifespan=lifespan,
     title="Oficina Vital API - Modo Local",
     description="API REST para gerenciamento de oficina de motos (sem banco de dados - apenas memória)",
     version="2.0.0-local",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Configurar CORS
@@ -50,50 +80,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Instâncias globais (em memória)
-controller = OficinaController()
-analytics = OficinaAnalytics(controller)
+# Compacta respostas maiores (listas e analytics repetem muito as mesmas chaves);
+# respostas pequenas como / e /health ficam abaixo do mínimo e saem sem compressão
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
-# Popula dados de exemplo ao iniciar
-@app.on_event("startup")
-def startup_event():
-    """Popula dados de exemplo ao iniciar a API."""
-    from main import popular_dados_exemplo
-    popular_dados_exemplo(controller)
-    print("[INFO] API iniciada em modo local (sem banco de dados)")
-    print("[INFO] Dados de exemplo carregados")
+# ==================== ENDPOINTS DE MOTOS ====================
 
+# Nos endpoints de listagem o to_dict() já tem o formato do schema: a lista sai
+# direto em ORJSONResponse, sem revalidar cada item pelo response_model
+# (o schema segue documentado em `responses`).
+# Listas acima deste tamanho são enviadas em streaming, item a item.
+_LIMITE_LISTA_SEM_STREAMING = 1000
 
-# ==================== ENDPOINTS DE MOTOS ====================
 
-@app.get("/api/motos", response_model=List[MotoResponse], tags=["Motos"])
+def _resposta_lista(objetos: List[Any]):
+    """Serializa uma lista de motos/checklists (via to_dict) na resposta adequada ao tamanho."""
+    if len(objetos) > _LIMITE_LISTA_SEM_STREAMING:
+        return ORJSONListaStreamingResponse(o.to_dict() for o in objetos)
+    return ORJSONResponse([o.to_dict() for o in objetos])
+
+
+@app.get(
+    "/api/motos",
+    response_model=None,
+    responses={200: {"model": List[MotoResponse]}},
+    tags=["Motos"]
+)
 def listar_motos(
     skip: int = 0,
     limit: Optional[int] = None,
     ordenar_por: Optional[str] = None
 ):
     """Lista todas as motos cadastradas com paginação e ordenação."""
-    motos = controller.listar_motos()
-    
-    # Ordenação
-    if ordenar_por:
-        ordenar_por = ordenar_por.lower()
-        if ordenar_por == "placa":
-            motos = sorted(motos, key=lambda m: m.placa)
-        elif ordenar_por == "modelo":
-            motos = sorted(motos, key=lambda m: m.modelo)
-        elif ordenar_por == "ano":
-            motos = sorted(motos, key=lambda m: m.ano, reverse=True)
-        elif ordenar_por == "marca":
-            motos = sorted(motos, key=lambda m: m.marca)
-    
-    # Paginação
-    if limit:
-        motos = motos[skip:skip + limit]
-    else:
-        motos = motos[skip:]
-    
-    return [m.to_dict() for m in motos]
+    # O controller ordena com attrgetter e guarda a lista ordenada até a próxima alteração
+    motos = controller.listar_motos(skip=skip, limit=limit, ordenar_por=ordenar_por)
+    return _resposta_lista(motos)
 
 
 @app.get("/api/motos/{placa}", response_model=MotoResponse, tags=["Motos"])
@@ -109,11 +130,16 @@ def buscar_moto_por_placa(placa: str):
         )
 
 
-@app.get("/api/motos/buscar/modelo", response_model=List[MotoResponse], tags=["Motos"])
+@app.get(
+    "/api/motos/buscar/modelo",
+    response_model=None,
+    responses={200: {"model": List[MotoResponse]}},
+    tags=["Motos"]
+)
 def buscar_motos_por_modelo(termo: str):
     """Busca motos por modelo (busca parcial, case-insensitive)."""
     motos = controller.buscar_motos_por_modelo(termo)
-    return [m.to_dict() for m in motos]
+    return _resposta_lista(motos)
 
 
 @app.post("/api/motos", response_model=MotoResponse, status_code=status.HTTP_201_CREATED, tags=["Motos"])
@@ -121,19 +147,12 @@ def cadastrar_moto(moto_data: MotoCreate):
     """Cadastra uma nova moto."""
     try:
         # Valida placa
-        valida, msg_erro = validar_placa_brasileira(moto_data.placa)
-        if not valida:
+        _, msg_erro = normalizar_e_validar(moto_data.placa)
+        if msg_erro:
             raise ValidacaoError(msg_erro)
         
         # Converte categoria string para enum
-        categoria_enum = None
-        for cat in CategoriaMoto:
-            if cat.value == moto_data.categoria or cat.name == moto_data.categoria:
-                categoria_enum = cat
-                break
-        
-        if categoria_enum is None:
-            categoria_enum = CategoriaMoto.OUTROS
+        categoria_enum = CATEGORIA_POR_CHAVE.get(moto_data.categoria, CategoriaMoto.OUTROS)
 
         moto = Moto(
             placa=moto_data.placa,
@@ -169,11 +188,12 @@ def atualizar_moto(placa: str, moto_data: MotoUpdate):
         if moto_data.cilindradas is not None:
             moto._set_cilindradas(moto_data.cilindradas)
         if moto_data.categoria is not None:
-            for cat in CategoriaMoto:
-                if cat.value == moto_data.categoria or cat.name == moto_data.categoria:
-                    moto._categoria = cat
-                    break
+            categoria_enum = CATEGORIA_POR_CHAVE.get(moto_data.categoria)
+            if categoria_enum is not None:
+                moto._categoria = categoria_enum
         
+        # A moto foi alterada fora do controller: invalida os índices/caches por versão
+        controller.notificar_alteracao()
         return moto.to_dict()
     except MotoNaoEncontradaError:
         raise HTTPException(
@@ -201,7 +221,12 @@ def deletar_moto(placa: str):
 
 # ==================== ENDPOINTS DE CHECKLISTS ====================
 
-@app.get("/api/checklists", response_model=List[ChecklistResponse], tags=["Checklists"])
+@app.get(
+    "/api/checklists",
+    response_model=None,
+    responses={200: {"model": List[ChecklistResponse]}},
+    tags=["Checklists"]
+)
 def listar_checklists(
     data_inicio: Optional[date] = None,
     data_fim: Optional[date] = None,
@@ -215,60 +240,47 @@ def listar_checklists(
 ):
     """Lista checklists com filtros opcionais, paginação e ordenação."""
     try:
+        # Um filtro por vez, nesta prioridade: placa, período, status do item,
+        # finalizado/pago. Ordenação e paginação ficam a cargo do controller.
+        paginacao = {"skip": skip, "limit": limit, "ordenar_por": ordenar_por}
         if placa:
-            checklists = controller.get_checklists_por_moto(placa)
+            checklists = controller.listar_checklists(placa=placa, **paginacao)
         elif data_inicio or data_fim:
-            checklists = controller.buscar_checklists_por_periodo(data_inicio, data_fim)
+            checklists = controller.listar_checklists(
+                data_inicio=data_inicio, data_fim=data_fim, **paginacao
+            )
         elif status_item:
-            status_enum = None
-            for s in StatusItem:
-                if s.value == status_item.lower() or s.name == status_item.upper():
-                    status_enum = s
-                    break
+            status_enum = status_por_texto(status_item)
             if status_enum is None:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Status inválido: {status_item}"
                 )
-            checklists = controller.buscar_checklists_por_status_item(status_enum)
+            checklists = controller.listar_checklists(status_item=status_enum, **paginacao)
         else:
-            checklists = controller.listar_checklists(finalizado=finalizado, pago=pago)
+            checklists = controller.listar_checklists(finalizado=finalizado, pago=pago, **paginacao)
         
-        # Ordenação
-        if ordenar_por:
-            ordenar_por = ordenar_por.lower()
-            if ordenar_por == "data":
-                checklists = sorted(checklists, key=lambda c: c.data_revisao, reverse=True)
-            elif ordenar_por == "km":
-                checklists = sorted(checklists, key=lambda c: c.km_atual, reverse=True)
-            elif ordenar_por == "custo":
-                checklists = sorted(checklists, key=lambda c: c.custo_total_estimado(), reverse=True)
-        
-        # Paginação
-        if limit:
-            checklists = checklists[skip:skip + limit]
-        else:
-            checklists = checklists[skip:]
-        
-        # Serializa para dict
-        return [ch.to_dict() for ch in checklists]
+        return _resposta_lista(checklists)
     except Exception as e:
-        import traceback
-        print(f"[ERRO] Erro ao listar checklists: {e}")
-        print(traceback.format_exc())
+        logger.exception(f"Erro ao listar checklists: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro interno ao listar checklists: {str(e)}"
         )
 
 
-@app.get("/api/checklists/moto/{placa}", response_model=List[ChecklistResponse], tags=["Checklists"])
+@app.get(
+    "/api/checklists/moto/{placa}",
+    response_model=None,
+    responses={200: {"model": List[ChecklistResponse]}},
+    tags=["Checklists"]
+)
 def listar_checklists_por_moto(placa: str):
     """Lista todos os checklists de uma moto específica."""
     try:
         controller.buscar_moto_por_placa(placa)  # Verifica se a moto existe
         checklists = controller.get_checklists_por_moto(placa)
-        return [ch.to_dict() for ch in checklists]
+        return _resposta_lista(checklists)
     except MotoNaoEncontradaError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -291,27 +303,13 @@ def buscar_checklist_por_id(checklist_id: int):
 @app.put("/api/checklists/{checklist_id}/status", response_model=ChecklistResponse, tags=["Checklists"])
 def atualizar_status_checklist(
     checklist_id: int,
-    finalizado: Optional[bool] = None,
-    pago: Optional[bool] = None,
-    custo_real: Optional[float] = None
+    dados: Annotated[ChecklistStatusUpdate, Query()]
 ):
     """Atualiza o status de finalização, pagamento e/ou custo real de um checklist."""
-    # Converte string "true"/"false" para boolean se necessário
-    if isinstance(finalizado, str):
-        finalizado = finalizado.lower() == 'true'
-    if isinstance(pago, str):
-        pago = pago.lower() == 'true'
-    if isinstance(custo_real, str):
-        try:
-            custo_real = float(custo_real) if custo_real else None
-        except ValueError:
-            custo_real = None
-    
+    # Campos já convertidos e validados (custo_real >= 0) pelo schema, ou 422
     checklist = controller.atualizar_status_checklist(
         checklist_id=checklist_id,
-        finalizado=finalizado,
-        pago=pago,
-        custo_real=custo_real
+        **dados.model_dump(exclude_none=True)
     )
     if not checklist:
         raise HTTPException(
@@ -340,24 +338,17 @@ def criar_checklist(checklist_data: ChecklistCreate):
             data_revisao=checklist_data.data_revisao
         )
 
-        # Se itens foram fornecidos, substitui os itens padrão
+        # Se itens foram fornecidos, substitui os itens padrão. A lista já chega
+        # validada pelo schema, com o status normalizado para o value do enum.
         if checklist_data.itens:
             checklist._itens = []
             for item_data in checklist_data.itens:
-                # Converte status string para enum
-                status_enum = StatusItem.PENDENTE
-                for s in StatusItem:
-                    if s.value == item_data.status or s.name == item_data.status.upper():
-                        status_enum = s
-                        break
-
-                item = ChecklistItem(
+                checklist.adicionar_item(ChecklistItem(
                     nome=item_data.nome,
                     categoria=item_data.categoria,
-                    status=status_enum,
+                    status=STATUS_POR_CHAVE[item_data.status],
                     custo_estimado=item_data.custo_estimado
-                )
-                checklist.adicionar_item(item)
+                ))
 
         checklist_id = controller.registrar_checklist(checklist)
         return controller.buscar_checklist_por_id(checklist_id).to_dict()
@@ -372,21 +363,19 @@ def criar_checklist(checklist_data: ChecklistCreate):
 def atualizar_item_checklist(
     checklist_id: int,
     item_index: int,
-    status: Optional[str] = None,
+    status_item: Optional[str] = Query(None, alias="status"),
     custo_estimado: Optional[float] = None
 ):
     """Atualiza um item específico de um checklist."""
-    # Converte status string para enum
+    # Converte status string para enum (o parâmetro continua se chamando "status"
+    # na URL; o nome interno evita esconder o módulo `status` do FastAPI)
     status_enum = None
-    if status:
-        for s in StatusItem:
-            if s.value == status or s.name == status.upper():
-                status_enum = s
-                break
+    if status_item:
+        status_enum = status_por_texto(status_item)
         if status_enum is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Status inválido: {status}"
+                detail=f"Status inválido: {status_item}"
             )
     
     sucesso = controller.atualizar_item_checklist(
@@ -411,14 +400,10 @@ def adicionar_item_checklist(
     """Adiciona um novo item customizado ao checklist."""
     try:
         # Converte status string para enum
+        # Se o validator já converteu, pode vir como value
         status_enum = StatusItem.PENDENTE
         if item_data.status:
-            status_str = item_data.status
-            # Se o validator já converteu, pode vir como value
-            for s in StatusItem:
-                if s.value == status_str or s.name == status_str.upper():
-                    status_enum = s
-                    break
+            status_enum = status_por_texto(item_data.status) or StatusItem.PENDENTE
         
         sucesso = controller.adicionar_item_checklist(
             checklist_id=checklist_id,
@@ -448,9 +433,7 @@ def adicionar_item_checklist(
             detail=f"Erro ao adicionar item: {str(e)}"
         )
     except Exception as e:
-        import traceback
-        print(f"[ERRO] Erro ao adicionar item: {e}")
-        print(traceback.format_exc())
+        logger.exception(f"Erro ao adicionar item: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro interno ao adicionar item: {str(e)}"
@@ -471,71 +454,72 @@ def deletar_checklist(checklist_id: int):
 
 # ==================== ENDPOINTS DE ANALYTICS ====================
 
-@app.get("/api/analytics", response_model=AnalyticsResponse, tags=["Analytics"])
+def _metricas_analytics(fonte: OficinaAnalytics) -> dict:
+    """Métricas do /api/analytics que não dependem de parâmetros da requisição."""
+    return {
+        "resumo_custos": fonte.resumo_custos(),
+        "resumo_custos_reais": fonte.resumo_custos_reais(),
+        "distribuicao_status": fonte.distribuicao_status_itens(),
+        "modelo_regressao": fonte.estimar_custo_por_km(),
+        "dados_historicos": fonte.dados_historicos_graficos(),
+    }
+
+
+@lru_cache(maxsize=256)
+def _analytics_da_placa(placa: str, versao: Tuple[int, int]) -> Tuple[OficinaAnalytics, dict]:
+    """
+    Analytics dos checklists de uma placa e suas métricas, calculados uma vez
+    por versão dos dados da placa (controller.versao_placa). `versao` só entra
+    na chave do cache. O resultado é compartilhado: não deve ser modificado.
+    """
+    # O analytics aceita a lista de checklists direto, sem controller temporário
+    analytics_placa = OficinaAnalytics(controller.get_checklists_por_moto(placa))
+    return analytics_placa, _metricas_analytics(analytics_placa)
+
+
+@app.get(
+    "/api/analytics",
+    response_model=None,
+    responses={200: {"model": AnalyticsResponse}},
+    tags=["Analytics"]
+)
 def obter_analytics(
     km_futuro: Optional[int] = None,
     placa: Optional[str] = None
 ):
     """Retorna análises estatísticas dos dados da oficina."""
-    # Se há filtro por placa, cria analytics temporário
     if placa:
-        from analytics.oficina_analytics import OficinaAnalytics
-        from controle.oficina_controller import OficinaController
-        
-        temp_controller = OficinaController()
-        checklists_filtrados = controller.get_checklists_por_moto(placa)
-        for ch in checklists_filtrados:
-            temp_controller._checklists.append(ch)
-        
-        temp_analytics = OficinaAnalytics(temp_controller)
-        resumo = temp_analytics.resumo_custos()
-        distribuicao = temp_analytics.distribuicao_status_itens()
-        modelo = temp_analytics.estimar_custo_por_km()
+        # Métricas da placa em cache até os checklists dela mudarem
+        fonte, metricas = _analytics_da_placa(placa.strip().upper(), controller.versao_placa(placa))
     else:
-        resumo = analytics.resumo_custos()
-        distribuicao = analytics.distribuicao_status_itens()
-        modelo = analytics.estimar_custo_por_km()
+        fonte, metricas = analytics, _metricas_analytics(analytics)
     
     previsao = None
-    if km_futuro is not None and modelo is not None:
-        if placa:
-            previsao = temp_analytics.prever_custo_para_km(km_futuro)
-        else:
-            previsao = analytics.prever_custo_para_km(km_futuro)
-    
-    resumo_custos_reais = None
-    dados_historicos = None
-    if placa:
-        resumo_custos_reais = temp_analytics.resumo_custos_reais()
-        dados_historicos = temp_analytics.dados_historicos_graficos()
-    else:
-        resumo_custos_reais = analytics.resumo_custos_reais()
-        dados_historicos = analytics.dados_historicos_graficos()
+    if km_futuro is not None and metricas["modelo_regressao"] is not None:
+        previsao = fonte.prever_custo_para_km(km_futuro)
     
-    return {
-        "resumo_custos": resumo,
-        "resumo_custos_reais": resumo_custos_reais,
-        "distribuicao_status": distribuicao,
-        "modelo_regressao": modelo,
+    # Dicionário já pronto para JSON: serializa direto com orjson, sem
+    # validar pelo AnalyticsResponse nem passar pelo jsonable_encoder
+    return ORJSONResponse({
+        "resumo_custos": metricas["resumo_custos"],
+        "resumo_custos_reais": metricas["resumo_custos_reais"],
+        "distribuicao_status": metricas["distribuicao_status"],
+        "modelo_regressao": metricas["modelo_regressao"],
         "previsao_custo_km": previsao,
-        "dados_historicos": dados_historicos
-    }
+        "dados_historicos": metricas["dados_historicos"]
+    })
 
 
-@app.get("/api/analytics/categoria", tags=["Analytics"])
+@app.get("/api/analytics/categoria", response_model=None, tags=["Analytics"])
 def obter_analytics_por_categoria():
     """Retorna estatísticas agrupadas por categoria de moto."""
-    from modelo.categoria_moto import CategoriaMoto
-    from analytics.oficina_analytics import OficinaAnalytics
-    from controle.oficina_controller import OficinaController
-    
     resultado = {}
     
     for categoria in CategoriaMoto:
-        # Filtra motos por categoria
-        motos_categoria = [m for m in controller.listar_motos() if m.categoria == categoria]
+        # Placas da categoria, direto do índice do controller
+        placas_categoria = controller.listar_placas_por_categoria(categoria)
         
-        if not motos_categoria:
+        if not placas_categoria:
             resultado[categoria.value] = {
                 "total_motos": 0,
                 "resumo_custos": {"soma": 0.0, "media": 0.0, "max": 0.0, "min": 0.0},
@@ -543,33 +527,21 @@ def obter_analytics_por_categoria():
             }
             continue
         
-        # Obtém checklists dessas motos
-        temp_controller = OficinaController()
-        placas_categoria = {m.placa for m in motos_categoria}
-        
-        checklists_categoria = []
-        for placa in placas_categoria:
-            checklists_categoria.extend(controller.get_checklists_por_moto(placa))
-        
-        # Adiciona ao controller temporário
-        for ch in checklists_categoria:
-            temp_controller._checklists.append(ch)
-            if ch.id is None:
-                ch._id = len(temp_controller._checklists)
+        # Obtém checklists dessas motos (uma passada pelo índice por placa)
+        checklists_categoria = controller.get_checklists_por_placas(placas_categoria)
         
-        temp_analytics = OficinaAnalytics(temp_controller)
-        resumo = temp_analytics.resumo_custos()
+        resumo = OficinaAnalytics(checklists_categoria).resumo_custos()
         
         resultado[categoria.value] = {
-            "total_motos": len(motos_categoria),
+            "total_motos": len(placas_categoria),
             "resumo_custos": resumo,
             "total_checklists": len(checklists_categoria)
         }
     
-    return resultado
+    return ORJSONResponse(resultado)
 
 
-@app.get("/api/financeiro", tags=["Financeiro"])
+@app.get("/api/financeiro", response_model=None, tags=["Financeiro"])
 def obter_relatorio_financeiro(
     tipo_periodo: Optional[str] = None,  # 'dia', 'semana', 'mes', 'ano'
     data_inicio: Optional[date] = None,
@@ -598,7 +570,7 @@ def obter_relatorio_financeiro(
             data_fim=data_fim
         )
     
-    return relatorio
+    return ORJSONResponse(relatorio)
 
 
 # ==================== HEALTH CHECK ====================
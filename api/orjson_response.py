@@ -0,0 +1,79 @@
+# api/orjson_response.py
+"""
+Resposta JSON serializada com orjson (bem mais rápido que o json da stdlib).
+"""
+from typing import Any, AsyncIterator, Iterable, Iterator
+
+import orjson
+from fastapi.responses import Response, StreamingResponse
+
+_OPCOES_ORJSON = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONResponse(Response):
+    """
+    Equivalente ao JSONResponse, mas usando orjson.
+    Também serializa arrays/escalares NumPy, datas e enums diretamente.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=_OPCOES_ORJSON)
+
+
+async def _lista_json_em_partes(itens: Iterable[Any], itens_por_parte: int) -> AsyncIterator[bytes]:
+    """
+    Gera uma lista JSON em pedaços de até `itens_por_parte` elementos.
+    É um gerador assíncrono de propósito: roda no event loop, sem threadpool.
+    """
+    parte = [b"["]
+    primeiro = True
+    for i, item in enumerate(itens, start=1):
+        if not primeiro:
+            parte.append(b",")
+        parte.append(orjson.dumps(item, option=_OPCOES_ORJSON))
+        primeiro = False
+        if i % itens_por_parte == 0:
+            yield b"".join(parte)
+            parte = []
+    parte.append(b"]")
+    yield b"".join(parte)
+
+
+class ORJSONListaStreamingResponse(StreamingResponse):
+    """
+    Envia uma lista JSON grande aos poucos, serializando item a item, sem
+    montar a lista de dicts nem o JSON inteiro em memória.
+    Como o corpo só pode ser enviado uma vez, a resposta não é reaproveitável.
+    """
+    media_type = "application/json"
+
+    def __init__(self, itens: Iterable[Any], itens_por_parte: int = 100, **kwargs: Any):
+        super().__init__(_lista_json_em_partes(itens, itens_por_parte), **kwargs)
+
+
+def _linhas_ndjson(itens: Iterable[Any], itens_por_parte: int) -> Iterator[bytes]:
+    """
+    Gera NDJSON (um objeto JSON por linha) em pedaços de até `itens_por_parte`.
+    Gerador síncrono: o Starlette o consome no threadpool, então `itens` pode
+    ser um cursor do banco sem travar o event loop.
+    """
+    parte = []
+    for item in itens:
+        parte.append(orjson.dumps(item, option=_OPCOES_ORJSON | orjson.OPT_APPEND_NEWLINE))
+        if len(parte) == itens_por_parte:
+            yield b"".join(parte)
+            parte = []
+    if parte:
+        yield b"".join(parte)
+
+
+class ORJSONLinhasStreamingResponse(StreamingResponse):
+    """
+    Envia os itens como NDJSON (application/x-ndjson), à medida que são lidos.
+    O cliente processa linha a linha, sem esperar nem guardar a lista inteira.
+    """
+    media_type = "application/x-ndjson"
+
+    def __init__(self, itens: Iterable[Any], itens_por_parte: int = 500, **kwargs: Any):
+        super().__init__(_linhas_ndjson(itens, itens_por_parte), **kwargs)
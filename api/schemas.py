@@ -1,9 +1,13 @@
 # api/schemas.py
 from datetime import date
 from typing import List, Optional
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from modelo.categoria_moto import CategoriaMoto
-from modelo.checklist_item import StatusItem
+from modelo.checklist_item import status_por_texto
+
+
+# Categoria pelo value em minúsculas ("big trail" -> BIG_TRAIL), montado uma vez
+_CATEGORIA_POR_VALUE = {c.value.lower(): c for c in CategoriaMoto}
 
 
 class MotoCreate(BaseModel):
@@ -15,19 +19,13 @@ class MotoCreate(BaseModel):
     cilindradas: int = Field(..., gt=0, description="Cilindradas em cc")
     categoria: str = Field(..., description="Categoria da moto")
 
-    @validator('categoria')
+    @field_validator('categoria')
+    @classmethod
     def validate_categoria(cls, v):
-        try:
-            return CategoriaMoto[v].value
-        except KeyError:
-            try:
-                # Tenta pelo value
-                for cat in CategoriaMoto:
-                    if cat.value.lower() == v.lower():
-                        return cat.value
-                raise ValueError(f"Categoria inválida. Opções: {[c.name for c in CategoriaMoto]}")
-            except:
-                raise ValueError(f"Categoria inválida. Opções: {[c.name for c in CategoriaMoto]}")
+        cat = CategoriaMoto.__members__.get(v) or _CATEGORIA_POR_VALUE.get(v.lower())
+        if cat is None:
+            raise ValueError(f"Categoria inválida. Opções: {[c.name for c in CategoriaMoto]}")
+        return cat.value
 
 
 class MotoUpdate(BaseModel):
@@ -38,20 +36,15 @@ class MotoUpdate(BaseModel):
     cilindradas: Optional[int] = Field(None, gt=0)
     categoria: Optional[str] = None
 
-    @validator('categoria')
+    @field_validator('categoria')
+    @classmethod
     def validate_categoria(cls, v):
         if v is None:
             return v
-        try:
-            return CategoriaMoto[v].value
-        except KeyError:
-            try:
-                for cat in CategoriaMoto:
-                    if cat.value.lower() == v.lower():
-                        return cat.value
-                raise ValueError(f"Categoria inválida")
-            except:
-                raise ValueError(f"Categoria inválida")
+        cat = CategoriaMoto.__members__.get(v) or _CATEGORIA_POR_VALUE.get(v.lower())
+        if cat is None:
+            raise ValueError("Categoria inválida")
+        return cat.value
 
 
 class MotoResponse(BaseModel):
@@ -65,8 +58,7 @@ class MotoResponse(BaseModel):
     categoria: str
     categoria_enum: str
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ChecklistItemCreate(BaseModel):
@@ -76,23 +68,14 @@ class ChecklistItemCreate(BaseModel):
     status: Optional[str] = Field(default="pendente")
     custo_estimado: Optional[float] = Field(default=0.0, ge=0.0)
 
-    @validator('status')
+    @field_validator('status')
+    @classmethod
     def validate_status(cls, v):
         if v is None:
             return "pendente"
-        try:
-            # Tenta pelo nome do enum
-            return StatusItem[v.upper()].value
-        except KeyError:
-            try:
-                # Tenta pelo value
-                for s in StatusItem:
-                    if s.value.lower() == v.lower():
-                        return s.value
-                # Se não encontrou, retorna pendente como padrão
-                return "pendente"
-            except:
-                return "pendente"
+        # Pelo nome ou pelo value do enum; se não encontrar, pendente como padrão
+        s = status_por_texto(v)
+        return s.value if s else "pendente"
 
 
 class ChecklistItemUpdate(BaseModel):
@@ -102,20 +85,15 @@ class ChecklistItemUpdate(BaseModel):
     status: Optional[str] = None
     custo_estimado: Optional[float] = Field(None, ge=0.0)
 
-    @validator('status')
+    @field_validator('status')
+    @classmethod
     def validate_status(cls, v):
         if v is None:
             return v
-        try:
-            return StatusItem[v.upper()].value
-        except KeyError:
-            try:
-                for s in StatusItem:
-                    if s.value.lower() == v.lower():
-                        return s.value
-                raise ValueError(f"Status inválido")
-            except:
-                raise ValueError(f"Status inválido")
+        s = status_por_texto(v)
+        if s is None:
+            raise ValueError("Status inválido")
+        return s.value
 
 
 class ChecklistItemResponse(BaseModel):
@@ -127,8 +105,7 @@ class ChecklistItemResponse(BaseModel):
     status_enum: str
     custo_estimado: float
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ChecklistCreate(BaseModel):
@@ -145,12 +122,22 @@ class ChecklistUpdate(BaseModel):
     data_revisao: Optional[date] = None
 
 
+class ChecklistStatusUpdate(BaseModel):
+    """
+    Schema para atualização de finalização/pagamento/custo real de um checklist.
+    Lido da query string (os clientes enviam ?finalizado=&pago=&custo_real=).
+    """
+    finalizado: Optional[bool] = None
+    pago: Optional[bool] = None
+    custo_real: Optional[float] = Field(None, ge=0)
+
+
 class ChecklistResponse(BaseModel):
     """Schema de resposta para checklist."""
     id: Optional[int] = None
     moto: MotoResponse
     km_atual: int
-    data_revisao: str
+    data_revisao: date
     data_formatada: str
     finalizado: bool = False
     pago: bool = False
@@ -162,8 +149,7 @@ class ChecklistResponse(BaseModel):
     total_ignorado: int = 0
     custo_total_estimado: float
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class AnalyticsResponse(BaseModel):
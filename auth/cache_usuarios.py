@@ -0,0 +1,53 @@
+# auth/cache_usuarios.py
+"""
+Cache dos usuários autenticados (em memória, por processo, com TTL).
+Evita um SELECT em `usuarios` a cada requisição que passa por
+get_current_user; o JWT continua sendo validado em toda requisição.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from db.models import UsuarioDB
+
+
+class CacheUsuarios:
+    """
+    Guarda o UsuarioDB (já desanexado da sessão) por username, por até
+    `ttl_segundos`. Alterações no usuário (ex: desativação) valem no
+    máximo após o TTL, ou na hora se quem alterar chamar `invalidar`.
+    """
+
+    def __init__(self, ttl_segundos: float = 60.0, max_itens: int = 10_000):
+        self._ttl = ttl_segundos
+        self._max_itens = max_itens
+        self._itens: "OrderedDict[str, Tuple[float, UsuarioDB]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, username: str) -> Optional[UsuarioDB]:
+        """Retorna o usuário guardado, ou None se não houver ou tiver expirado."""
+        with self._lock:
+            entrada = self._itens.get(username)
+            if entrada is None:
+                return None
+            expira_em, usuario = entrada
+            if expira_em <= time.monotonic():
+                del self._itens[username]
+                return None
+            return usuario
+
+    def guardar(self, username: str, usuario: UsuarioDB) -> None:
+        with self._lock:
+            self._itens[username] = (time.monotonic() + self._ttl, usuario)
+            self._itens.move_to_end(username)
+            while len(self._itens) > self._max_itens:
+                self._itens.popitem(last=False)
+
+    def invalidar(self, username: str) -> None:
+        with self._lock:
+            self._itens.pop(username, None)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
@@ -7,12 +7,17 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from typing import Optional
 
+from config import settings
 from database import get_db
 from db.repository import UsuarioRepository
 from auth.security import decode_access_token
+from auth.cache_usuarios import CacheUsuarios
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+# Usuários já buscados no banco, por username (ver CacheUsuarios)
+cache_usuarios = CacheUsuarios(ttl_segundos=settings.AUTH_USER_CACHE_TTL_SECONDS)
+
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
@@ -35,11 +40,17 @@ async def get_current_user(
     if username is None:
         raise credentials_exception
     
-    user = UsuarioRepository.buscar_por_username(db, username)
+    user = cache_usuarios.obter(username)
     if user is None:
-        raise credentials_exception
+        user = UsuarioRepository.buscar_por_username(db, username)
+        if user is None:
+            raise credentials_exception
+        # Desanexa da sessão: o commit de um endpoint não expira os atributos
+        # e o objeto pode ser lido com segurança nas próximas requisições
+        db.expunge(user)
+        cache_usuarios.guardar(username, user)
     
-    if user.is_active != "true":
+    if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Usuário inativo"
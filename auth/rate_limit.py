@@ -0,0 +1,66 @@
+# auth/rate_limit.py
+"""
+Limitador simples de tentativas (janela deslizante em memória).
+Usado no login para barrar força bruta antes de calcular o hash bcrypt.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque
+
+
+class LimitadorTentativas:
+    """
+    Permite no máximo `max_tentativas` por chave (ex: IP do cliente)
+    dentro de `janela_segundos`. Guarda no máximo `max_chaves` chaves:
+    a usada há mais tempo sai primeiro.
+    """
+
+    def __init__(self, max_tentativas: int, janela_segundos: float = 60.0, max_chaves: int = 10_000):
+        self._max_tentativas = max_tentativas
+        self._janela = janela_segundos
+        self._max_chaves = max_chaves
+        self._tentativas: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def permitir(self, chave: str) -> bool:
+        """
+        Registra uma tentativa para a chave.
+        Retorna False se o limite da janela já foi atingido.
+        """
+        agora = time.monotonic()
+        limite = agora - self._janela
+
+        with self._lock:
+            tentativas = self._tentativas.get(chave)
+            if tentativas is None:
+                tentativas = self._tentativas[chave] = deque()
+            else:
+                self._tentativas.move_to_end(chave)
+            while tentativas and tentativas[0] <= limite:
+                tentativas.popleft()
+
+            if len(tentativas) >= self._max_tentativas:
+                return False
+
+            tentativas.append(agora)
+            while len(self._tentativas) > self._max_chaves:
+                self._tentativas.popitem(last=False)
+            return True
+
+    def desfazer(self, chave: str) -> None:
+        """
+        Descarta a última tentativa registrada para a chave (ex: login bem-sucedido),
+        para que só as tentativas que falharam contem no limite.
+        """
+        with self._lock:
+            tentativas = self._tentativas.get(chave)
+            if tentativas:
+                tentativas.pop()
+            if not tentativas:
+                self._tentativas.pop(chave, None)
+
+    def limpar(self) -> None:
+        """Esquece todas as tentativas registradas."""
+        with self._lock:
+            self._tentativas.clear()
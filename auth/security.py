@@ -3,6 +3,7 @@
 Funções de segurança para autenticação JWT.
 """
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -11,6 +12,12 @@ from config import settings
 # Contexto para hash de senhas
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Parâmetros do JWT, lidos uma vez na importação
+SECRET_KEY = settings.SECRET_KEY
+ALGORITHM = settings.ALGORITHM
+_ALGORITHMS = [ALGORITHM]
+_ACCESS_TOKEN_EXPIRE = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica se a senha está correta."""
@@ -22,6 +29,15 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+@lru_cache(maxsize=1)
+def get_dummy_password_hash() -> str:
+    """
+    Hash fictício (mesmo custo do bcrypt real), usado no login quando o
+    usuário não existe, para o tempo de resposta não revelar isso.
+    """
+    return pwd_context.hash("usuario-inexistente")
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Cria um token JWT.
@@ -38,10 +54,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = datetime.utcnow() + _ACCESS_TOKEN_EXPIRE
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
@@ -53,7 +69,7 @@ def decode_access_token(token: str) -> Optional[dict]:
         Dados do token se válido, None caso contrário
     """
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=_ALGORITHMS)
         return payload
     except JWTError:
         return None
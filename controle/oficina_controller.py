@@ -1,13 +1,75 @@
 # controle/oficina_controller.py
 from .excecoes import MotoNaoEncontradaError
-from typing import List, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import heapq
 from datetime import date
+from functools import lru_cache
+from operator import attrgetter, methodcaller
 
 from modelo.moto import Moto
+from modelo.categoria_moto import CategoriaMoto
 from modelo.checklist import Checklist
 from modelo.checklist_item import ChecklistItem, StatusItem
 
 
+# Campos aceitos em `ordenar_por`: campo -> (chave de ordenação, decrescente?)
+_ORDENACAO_MOTOS: Dict[str, Tuple[Callable, bool]] = {
+    "placa": (attrgetter("placa"), False),
+    "modelo": (attrgetter("modelo"), False),
+    "ano": (attrgetter("ano"), True),
+    "marca": (attrgetter("marca"), False),
+}
+
+_ORDENACAO_CHECKLISTS: Dict[str, Tuple[Callable, bool]] = {
+    "data": (attrgetter("data_revisao"), True),
+    "km": (attrgetter("km_atual"), True),
+    # Chamada uma vez por checklist (sort/heapq avaliam a chave uma vez por
+    # item) e o Checklist guarda o custo em cache até os itens mudarem
+    "custo": (methodcaller("custo_total_estimado"), True),
+}
+
+
+# Acima disso, deletar_moto recria a lista de checklists numa passada só em vez
+# de remover um a um (cada list.remove percorre a lista)
+_MAX_REMOCOES_NO_LUGAR = 8
+
+
+@lru_cache(maxsize=4096)
+def _chave_placa(placa: str) -> str:
+    """Placa na forma usada como chave dos índices (a mesma de Veiculo.placa)."""
+    return placa.strip().upper()
+
+
+def _paginar(
+    itens: Iterable,
+    skip: int,
+    limit: Optional[int],
+    ordenar_por: Optional[str],
+    ordenacoes: Dict[str, Tuple[Callable, bool]],
+) -> list:
+    """
+    Ordena (se o campo for conhecido) e devolve só a fatia pedida.
+    Campo de ordenação desconhecido mantém a ordem de cadastro.
+    """
+    skip = max(skip, 0)
+    ordenacao = ordenacoes.get(ordenar_por.lower()) if ordenar_por else None
+    if not isinstance(itens, list):
+        itens = list(itens)
+    if ordenacao is not None:
+        chave, decrescente = ordenacao
+        if limit and skip + limit < len(itens) // 4:
+            # Só os skip+limit primeiros interessam: O(n log k) em vez de ordenar tudo
+            # (nlargest/nsmallest equivalem a sorted(...)[:k], inclusive na estabilidade).
+            # Com páginas maiores o heap perde para o sort (Timsort, em C)
+            selecionar = heapq.nlargest if decrescente else heapq.nsmallest
+            return selecionar(skip + limit, itens, key=chave)[skip:]
+        itens = sorted(itens, key=chave, reverse=decrescente)
+
+    if limit:
+        return itens[skip:skip + limit]
+    return itens[skip:]
+
+
 class OficinaController:
     """
     Controlador principal da oficina.
@@ -18,8 +80,55 @@ class OficinaController:
     def __init__(self):
         self._motos: List[Moto] = []
         self._checklists: List[Checklist] = []
+        # Índices por placa (já normalizada em maiúsculas, como em Veiculo.placa)
+        self._motos_por_placa: Dict[str, Moto] = {}
+        self._checklists_por_placa: Dict[str, List[Checklist]] = {}
+        # Checklists por ID, e o maior ID já usado (IDs não são reaproveitados)
+        self._checklists_por_id: Dict[int, Checklist] = {}
+        self._ultimo_id = 0
+        # Listas de motos já ordenadas por campo, válidas para a versão das motos guardada
+        self._motos_ordenadas: Dict[str, Tuple[int, List[Moto]]] = {}
+        # Índice de trigramas do modelo (minúsculo) -> posições em _motos, por versão das motos
+        self._indice_modelo: Optional[Tuple[int, List[str], Dict[str, Set[int]]]] = None
+        # Motos agrupadas por categoria, por versão das motos, com as placas em lista paralela
+        self._indice_categoria: Optional[
+            Tuple[int, Dict[CategoriaMoto, Tuple[List[Moto], List[str]]]]
+        ] = None
+        # Incrementada a cada alteração nos dados (usada para invalidar caches)
+        self._version = 0
+        # Só muda com cadastro/remoção de moto ou notificar_alteracao: os índices
+        # de motos acima não precisam ser refeitos a cada escrita de checklist
+        self._versao_motos = 0
+        # Alterações nos checklists de cada placa, e alterações feitas fora do
+        # controller (notificar_alteracao), que podem ter tocado qualquer placa
+        self._versao_por_placa: Dict[str, int] = {}
+        self._alteracoes_diretas = 0
         print("LOG: OficinaController inicializado.")
 
+    @property
+    def versao(self) -> int:
+        """Versão atual dos dados; muda sempre que algo é cadastrado/alterado/removido."""
+        return self._version
+
+    def versao_placa(self, placa: str) -> Tuple[int, int]:
+        """
+        Versão dos dados de uma moto e seus checklists: muda quando algo dessa
+        placa é alterado (ou em notificar_alteracao), mas não com as outras placas.
+        """
+        return self._alteracoes_diretas, self._versao_por_placa.get(_chave_placa(placa), 0)
+
+    def notificar_alteracao(self) -> None:
+        """
+        Avisa que uma moto/checklist foi alterado diretamente (fora dos métodos
+        do controller), para que caches baseados na versão sejam invalidados.
+        """
+        self._version += 1
+        self._versao_motos += 1
+        self._alteracoes_diretas += 1
+
+    def _alterou_placa(self, placa: str) -> None:
+        self._versao_por_placa[placa] = self._versao_por_placa.get(placa, 0) + 1
+
     # -------------------------
     # MOTO
     # -------------------------
@@ -36,6 +145,9 @@ class OficinaController:
             return
 
         self._motos.append(moto)
+        self._motos_por_placa[moto.placa] = moto
+        self._version += 1
+        self._versao_motos += 1
         print(f"LOG: Moto cadastrada: {moto.placa} - {moto.modelo}")
 
     def get_moto_por_placa(self, placa: str) -> Optional[Moto]:
@@ -45,11 +157,11 @@ class OficinaController:
         if not placa:
             return None
 
-        placa = placa.strip().upper()
-        for m in self._motos:
-            if m.placa == placa:
-                return m
-        return None
+        return self._motos_por_placa.get(_chave_placa(placa))
+
+    def moto_existe(self, placa: str) -> bool:
+        """Indica se há moto cadastrada com a placa."""
+        return self.get_moto_por_placa(placa) is not None
 
 
     def buscar_moto_por_placa(self, placa: str) -> Moto:
@@ -64,11 +176,41 @@ class OficinaController:
             raise MotoNaoEncontradaError(placa)
         return moto
 
-    def listar_motos(self) -> List[Moto]:
+    def listar_motos(
+        self,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        ordenar_por: Optional[str] = None
+    ) -> List[Moto]:
         """
-        Retorna a lista de motos cadastradas.
+        Retorna a lista de motos cadastradas, opcionalmente ordenada e paginada.
+
+        Args:
+            skip: Número de registros para pular.
+            limit: Número máximo de registros (None = todos).
+            ordenar_por: placa, modelo, ano ou marca.
         """
-        return list(self._motos)
+        motos = self.listar_motos_ordenado(ordenar_por) if ordenar_por else self._motos
+        return _paginar(motos, skip, limit, None, _ORDENACAO_MOTOS)
+
+    def listar_motos_ordenado(self, campo: str) -> List[Moto]:
+        """
+        Retorna as motos ordenadas pelo campo (placa, modelo, ano ou marca).
+        A ordenação é feita uma vez e reaproveitada até a próxima alteração
+        nos dados; campo desconhecido mantém a ordem de cadastro.
+        A lista devolvida é compartilhada: não deve ser modificada.
+        """
+        campo = campo.lower()
+        ordenacao = _ORDENACAO_MOTOS.get(campo)
+        if ordenacao is None:
+            return self._motos
+
+        versao, motos = self._motos_ordenadas.get(campo, (None, None))
+        if versao != self._versao_motos:
+            chave, decrescente = ordenacao
+            motos = sorted(self._motos, key=chave, reverse=decrescente)
+            self._motos_ordenadas[campo] = (self._versao_motos, motos)
+        return motos
 
     def buscar_motos_por_modelo(self, termo_modelo: str) -> List[Moto]:
         """
@@ -80,7 +222,54 @@ class OficinaController:
             return []
 
         termo = termo_modelo.strip().lower()
-        return [m for m in self._motos if termo in m.modelo.lower()]
+        modelos, trigramas = self._obter_indice_modelo()
+
+        if len(termo) < 3:
+            candidatos = range(len(modelos))
+        else:
+            # Só as motos que têm todos os trigramas do termo podem conter o termo
+            conjuntos = [trigramas.get(termo[i:i + 3], set()) for i in range(len(termo) - 2)]
+            candidatos = sorted(set.intersection(*conjuntos))
+
+        return [self._motos[i] for i in candidatos if termo in modelos[i]]
+
+    def _obter_indice_modelo(self) -> Tuple[List[str], Dict[str, Set[int]]]:
+        """
+        Modelos em minúsculas e índice de trigramas, reconstruídos só quando
+        a versão das motos muda (cobre também edições via notificar_alteracao).
+        """
+        if self._indice_modelo is None or self._indice_modelo[0] != self._versao_motos:
+            modelos = [m.modelo.lower() for m in self._motos]
+            trigramas: Dict[str, Set[int]] = {}
+            for i, modelo in enumerate(modelos):
+                for j in range(len(modelo) - 2):
+                    trigramas.setdefault(modelo[j:j + 3], set()).add(i)
+            self._indice_modelo = (self._versao_motos, modelos, trigramas)
+        return self._indice_modelo[1], self._indice_modelo[2]
+
+    def _grupo_categoria(self, categoria: CategoriaMoto) -> Tuple[List[Moto], List[str]]:
+        if self._indice_categoria is None or self._indice_categoria[0] != self._versao_motos:
+            por_categoria: Dict[CategoriaMoto, Tuple[List[Moto], List[str]]] = {}
+            for moto in self._motos:
+                motos, placas = por_categoria.setdefault(moto.categoria, ([], []))
+                motos.append(moto)
+                placas.append(moto.placa)
+            self._indice_categoria = (self._versao_motos, por_categoria)
+        return self._indice_categoria[1].get(categoria, ([], []))
+
+    def listar_motos_por_categoria(self, categoria: CategoriaMoto) -> List[Moto]:
+        """
+        Retorna as motos da categoria, na ordem de cadastro.
+        A lista devolvida é compartilhada: não deve ser modificada.
+        """
+        return self._grupo_categoria(categoria)[0]
+
+    def listar_placas_por_categoria(self, categoria: CategoriaMoto) -> List[str]:
+        """
+        Placas das motos da categoria, na mesma ordem de listar_motos_por_categoria
+        (sem passar pelos objetos Moto). Lista compartilhada: não deve ser modificada.
+        """
+        return self._grupo_categoria(categoria)[1]
 
 
     # -------------------------
@@ -89,10 +278,12 @@ class OficinaController:
     def registrar_checklist(self, checklist: Checklist) -> int:
         """
         Registra um checklist de revisão.
-        Retorna o ID do checklist (índice na lista + 1).
+        Retorna o ID do checklist (sequencial, a partir de 1).
         """
         if not isinstance(checklist, Checklist):
             raise ValueError("Checklist inválido.")
+        if checklist.id is not None and checklist.id in self._checklists_por_id:
+            raise ValueError(f"Já existe checklist com ID {checklist.id}.")
 
         # Garante que a moto do checklist está cadastrada
         moto = self.get_moto_por_placa(checklist.moto.placa)
@@ -105,15 +296,42 @@ class OficinaController:
 
         # Atribui um ID se não tiver
         if checklist.id is None:
-            checklist._id = len(self._checklists) + 1
+            checklist._id = self._ultimo_id + 1
+        self._ultimo_id = max(self._ultimo_id, checklist.id)
         
         self._checklists.append(checklist)
+        self._checklists_por_id[checklist.id] = checklist
+        self._checklists_por_placa.setdefault(checklist.moto.placa, []).append(checklist)
+        self._alterou_placa(checklist.moto.placa)
+        self._version += 1
         print(
             f"LOG: Checklist registrado para moto {checklist.moto.placa} "
             f"na data {checklist.data_formatada}."
         )
         return checklist.id
 
+    def get_moto_e_checklists(self, placa: str) -> Tuple[Optional[Moto], List[Checklist]]:
+        """
+        Retorna a moto e seu histórico de checklists numa única consulta aos
+        índices. Se a moto não existir, retorna (None, []).
+        """
+        if not placa:
+            return None, []
+
+        placa = _chave_placa(placa)
+        moto = self._motos_por_placa.get(placa)
+        if moto is None:
+            return None, []
+        return moto, list(self._checklists_por_placa.get(placa, ()))
+
+    def get_checklists_por_placas(self, placas: Iterable[str]) -> List[Checklist]:
+        """
+        Checklists de várias motos numa lista só, direto do índice por placa
+        (placas já normalizadas, como Moto.placa).
+        """
+        por_placa = self._checklists_por_placa
+        return [c for placa in placas for c in por_placa.get(placa, ())]
+
     def get_checklists_por_moto(self, placa: str) -> List[Checklist]:
         """
         Retorna todos os checklists de uma moto específica (histórico de revisões).
@@ -121,42 +339,74 @@ class OficinaController:
         if not placa:
             return []
 
-        placa = placa.strip().upper()
-        return [c for c in self._checklists if c.moto.placa == placa]
+        return list(self._checklists_por_placa.get(_chave_placa(placa), ()))
 
-    def listar_checklists(self, finalizado: Optional[bool] = None, pago: Optional[bool] = None) -> List[Checklist]:
+    def listar_checklists(
+        self,
+        finalizado: Optional[bool] = None,
+        pago: Optional[bool] = None,
+        placa: Optional[str] = None,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None,
+        status_item: Optional[StatusItem] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        ordenar_por: Optional[str] = None
+    ) -> List[Checklist]:
         """
-        Retorna todos os checklists registrados, opcionalmente filtrados por status.
+        Retorna os checklists registrados, com filtros, ordenação e paginação opcionais.
+        Os filtros informados são combinados (todos precisam ser atendidos).
         
         Args:
             finalizado: Se True, retorna apenas finalizados. Se False, apenas não finalizados. Se None, todos.
             pago: Se True, retorna apenas pagos. Se False, apenas não pagos. Se None, todos.
+            placa: Apenas checklists da moto com esta placa.
+            data_inicio / data_fim: Intervalo (inclusivo) da data de revisão.
+            status_item: Apenas checklists com pelo menos um item neste status.
+            skip: Número de registros para pular.
+            limit: Número máximo de registros (None = todos).
+            ordenar_por: data, km ou custo (todos decrescentes).
         """
-        checklists = list(self._checklists)
-        
-        # Aplica filtros se fornecidos
-        if finalizado is not None:
-            checklists = [c for c in checklists if c.finalizado == finalizado]
-        
-        if pago is not None:
-            checklists = [c for c in checklists if c.pago == pago]
-        
-        return checklists
+        checklists = self._checklists
+        if placa:
+            # Usa o índice por placa em vez de varrer todos os checklists
+            checklists = self._checklists_por_placa.get(_chave_placa(placa), [])
+
+        def atende(c: Checklist) -> bool:
+            if finalizado is not None and c.finalizado != finalizado:
+                return False
+            if pago is not None and c.pago != pago:
+                return False
+            if data_inicio and c.data_revisao < data_inicio:
+                return False
+            if data_fim and c.data_revisao > data_fim:
+                return False
+            if status_item is not None and not any(i.status is status_item for i in c._itens):
+                return False
+            return True
+
+        filtrar = (
+            finalizado is not None or pago is not None
+            or data_inicio or data_fim or status_item is not None
+        )
+        if filtrar:
+            checklists = filter(atende, checklists)
+        return _paginar(checklists, skip, limit, ordenar_por, _ORDENACAO_CHECKLISTS)
     
     def buscar_checklist_por_id(self, checklist_id: int) -> Optional[Checklist]:
         """Busca um checklist pelo ID único."""
-        for checklist in self._checklists:
-            if checklist.id == checklist_id:
-                return checklist
-        return None
+        return self._checklists_por_id.get(checklist_id)
     
     def deletar_checklist_por_id(self, checklist_id: int) -> bool:
         """Remove um checklist pelo ID."""
-        for i, checklist in enumerate(self._checklists):
-            if checklist.id == checklist_id:
-                self._checklists.pop(i)
-                return True
-        return False
+        checklist = self._checklists_por_id.pop(checklist_id, None)
+        if checklist is None:
+            return False
+        self._checklists.remove(checklist)
+        self._checklists_por_placa[checklist.moto.placa].remove(checklist)
+        self._alterou_placa(checklist.moto.placa)
+        self._version += 1
+        return True
     
     def buscar_checklists_por_periodo(
         self,
@@ -176,13 +426,11 @@ class OficinaController:
     
     def buscar_checklists_por_status_item(self, status: StatusItem) -> List[Checklist]:
         """Busca checklists que possuem pelo menos um item com o status especificado."""
-        resultado = []
-        for checklist in self._checklists:
-            for item in checklist.itens:
-                if item.status == status:
-                    resultado.append(checklist)
-                    break
-        return resultado
+        # _itens direto (sem a cópia de .itens); enum é singleton, então `is` basta
+        return [
+            c for c in self._checklists
+            if any(item.status is status for item in c._itens)
+        ]
     
     def atualizar_item_checklist(
         self,
@@ -190,17 +438,17 @@ class OficinaController:
         item_index: int,
         status: Optional[StatusItem] = None,
         custo_estimado: Optional[float] = None
-    ) -> bool:
+    ) -> Optional[Checklist]:
         """
         Atualiza um item específico de um checklist.
-        Retorna True se atualizado com sucesso.
+        Retorna o checklist atualizado, ou None se o checklist/item não existir.
         """
         checklist = self.buscar_checklist_por_id(checklist_id)
         if not checklist:
-            return False
+            return None
         
         if item_index < 0 or item_index >= len(checklist._itens):
-            return False
+            return None
         
         item = checklist._itens[item_index]
         
@@ -210,7 +458,10 @@ class OficinaController:
         if custo_estimado is not None:
             item.custo_estimado = custo_estimado
         
-        return True
+        checklist.invalidar_custo()
+        self._alterou_placa(checklist.moto.placa)
+        self._version += 1
+        return checklist
     
     def adicionar_item_checklist(
         self,
@@ -230,6 +481,8 @@ class OficinaController:
         
         item = ChecklistItem(nome=nome, categoria=categoria, status=status, custo_estimado=custo_estimado)
         checklist.adicionar_item(item)
+        self._alterou_placa(checklist.moto.placa)
+        self._version += 1
         return True
     
     def atualizar_status_checklist(
@@ -257,6 +510,8 @@ class OficinaController:
                 raise ValueError("Custo real não pode ser negativo.")
             checklist.custo_real = custo_real
         
+        self._alterou_placa(checklist.moto.placa)
+        self._version += 1
         return checklist
     
     def deletar_moto(self, placa: str) -> bool:
@@ -268,10 +523,23 @@ class OficinaController:
         if moto is None:
             return False
         
-        # Remove checklists relacionados
-        self._checklists = [c for c in self._checklists if c.moto.placa != placa]
+        # Remove checklists relacionados, mantendo a ordem de cadastro dos demais.
+        # Poucos: remove no lugar (list.remove, em C) sem recriar a lista toda
+        removidos = self._checklists_por_placa.pop(moto.placa, None)
+        if removidos:
+            if len(removidos) <= _MAX_REMOCOES_NO_LUGAR:
+                for checklist in removidos:
+                    self._checklists.remove(checklist)
+            else:
+                self._checklists = [c for c in self._checklists if c.moto.placa != moto.placa]
+            for checklist in removidos:
+                del self._checklists_por_id[checklist.id]
         
         # Remove a moto
-        self._motos = [m for m in self._motos if m.placa != placa]
+        self._motos.remove(moto)
+        del self._motos_por_placa[moto.placa]
         
+        self._alterou_placa(moto.placa)
+        self._version += 1
+        self._versao_motos += 1
         return True
@@ -3,10 +3,14 @@
 Controller que usa banco de dados PostgreSQL.
 Mantém a mesma interface do OficinaController para compatibilidade.
 """
+import threading
+import time
 from sqlalchemy.orm import Session
-from typing import List, Optional, TYPE_CHECKING
+from typing import Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING
 from datetime import date
 
+import numpy as np
+
 from .excecoes import MotoNaoEncontradaError
 from .validadores import validar_placa_brasileira
 from modelo.moto import Moto
@@ -14,11 +18,20 @@ from modelo.checklist import Checklist
 from modelo.checklist_item import StatusItem
 from db.repository import MotoRepository, ChecklistRepository
 from db.converter import moto_db_para_dominio, checklist_db_para_dominio
+from db.resumos import atualizador_resumos
 
 if TYPE_CHECKING:
     from modelo.categoria_moto import CategoriaMoto
 
 
+# Escritas feitas por este processo (qualquer instância do controller).
+# Escritas de outros workers não chegam aqui: por isso a versão também
+# muda a cada TTL_VERSAO segundos.
+TTL_VERSAO = 60.0
+_escritas = 0
+_lock_escritas = threading.Lock()
+
+
 class OficinaControllerDB:
     """
     Controlador principal da oficina usando banco de dados PostgreSQL.
@@ -35,6 +48,22 @@ class OficinaControllerDB:
         """
         self._db = db
     
+    @property
+    def versao(self) -> Tuple[int, int]:
+        """
+        Versão dos dados para caches (ex.: MemoAnalytics): muda a cada escrita
+        feita por este processo e, no máximo, a cada TTL_VERSAO segundos.
+        """
+        return _escritas, int(time.monotonic() // TTL_VERSAO)
+    
+    def notificar_alteracao(self) -> None:
+        """Avisa que os dados mudaram, para que caches baseados na versão sejam invalidados."""
+        global _escritas
+        with _lock_escritas:
+            _escritas += 1
+        # Visões materializadas dos relatórios (só PostgreSQL), com espera
+        atualizador_resumos.agendar()
+    
     # -------------------------
     # MOTO
     # -------------------------
@@ -51,10 +80,11 @@ class OficinaControllerDB:
             raise ValueError(msg_erro)
         
         # Verifica se já existe
-        if MotoRepository.buscar_por_placa(self._db, moto.placa):
+        if MotoRepository.existe(self._db, moto.placa):
             raise ValueError(f"Moto com placa {moto.placa} já cadastrada.")
         
         MotoRepository.criar(self._db, moto)
+        self.notificar_alteracao()
     
     def get_moto_por_placa(self, placa: str) -> Optional[Moto]:
         """
@@ -65,6 +95,12 @@ class OficinaControllerDB:
             return moto_db_para_dominio(moto_db)
         return None
     
+    def moto_existe(self, placa: str) -> bool:
+        """Indica se há moto cadastrada com a placa (sem carregar os dados)."""
+        if not placa:
+            return False
+        return MotoRepository.existe(self._db, placa)
+    
     def buscar_moto_por_placa(self, placa: str) -> Moto:
         """
         Busca moto pela placa.
@@ -76,11 +112,23 @@ class OficinaControllerDB:
             raise MotoNaoEncontradaError(placa)
         return moto
     
-    def listar_motos(self) -> List[Moto]:
+    def listar_motos(
+        self,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        ordenar_por: Optional[str] = None
+    ) -> List[Moto]:
         """
-        Retorna a lista de motos cadastradas.
+        Retorna a lista de motos cadastradas, ordenada e paginada no banco.
+
+        Args:
+            skip: Número de registros para pular.
+            limit: Número máximo de registros (None = todos).
+            ordenar_por: placa, modelo, ano ou marca.
         """
-        motos_db = MotoRepository.listar_todas(self._db)
+        motos_db = MotoRepository.listar_todas(
+            self._db, skip=skip, limit=limit, ordenar_por=ordenar_por
+        )
         return [moto_db_para_dominio(m) for m in motos_db]
     
     def buscar_motos_por_modelo(self, termo_modelo: str) -> List[Moto]:
@@ -118,12 +166,10 @@ class OficinaControllerDB:
         """
         Processa e converte categoria (string ou enum) para CategoriaMoto.
         """
-        from modelo.categoria_moto import CategoriaMoto
+        from modelo.categoria_moto import CATEGORIA_POR_CHAVE
         
         if isinstance(categoria, str):
-            for cat in CategoriaMoto:
-                if cat.value == categoria or cat.name == categoria:
-                    return cat
+            return CATEGORIA_POR_CHAVE.get(categoria, categoria)
         return categoria
     
     def atualizar_moto(self, placa: str, **kwargs) -> Optional[Moto]:
@@ -137,6 +183,7 @@ class OficinaControllerDB:
         
         dados_atualizacao = self._preparar_dados_atualizacao(kwargs)
         MotoRepository.atualizar(self._db, moto_db, **dados_atualizacao)
+        self.notificar_alteracao()
         return moto_db_para_dominio(moto_db)
     
     def deletar_moto(self, placa: str) -> bool:
@@ -149,6 +196,7 @@ class OficinaControllerDB:
             return False
         
         MotoRepository.deletar(self._db, moto_db)
+        self.notificar_alteracao()
         return True
     
     # -------------------------
@@ -201,6 +249,7 @@ class OficinaControllerDB:
             moto_db = MotoRepository.buscar_por_placa(self._db, checklist.moto.placa)
         
         checklist_db = ChecklistRepository.criar(self._db, checklist, moto_db)
+        self.notificar_alteracao()
         return checklist_db.id
     
     def buscar_checklist_por_id(self, checklist_id: int) -> Optional[Checklist]:
@@ -220,13 +269,64 @@ class OficinaControllerDB:
         checklists_db = ChecklistRepository.buscar_por_moto(self._db, placa)
         return [checklist_db_para_dominio(c) for c in checklists_db]
     
-    def listar_checklists(self, finalizado: Optional[bool] = None, pago: Optional[bool] = None) -> List[Checklist]:
+    def listar_checklists(
+        self,
+        finalizado: Optional[bool] = None,
+        pago: Optional[bool] = None,
+        placa: Optional[str] = None,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None,
+        status_item: Optional[StatusItem] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        ordenar_por: Optional[str] = None
+    ) -> List[Checklist]:
         """
-        Retorna todos os checklists registrados.
+        Retorna os checklists registrados. Filtros (combinados), ordenação
+        (data, km ou custo) e paginação são aplicados na própria query.
         """
-        checklists_db = ChecklistRepository.listar_todos(self._db, finalizado=finalizado, pago=pago)
+        checklists_db = ChecklistRepository.listar_todos(
+            self._db,
+            skip=skip,
+            limit=limit,
+            placa=placa,
+            data_inicio=data_inicio,
+            data_fim=data_fim,
+            finalizado=finalizado,
+            pago=pago,
+            status_item=status_item,
+            ordenar_por=ordenar_por
+        )
         return [checklist_db_para_dominio(c) for c in checklists_db]
     
+    def iterar_checklists(
+        self,
+        finalizado: Optional[bool] = None,
+        pago: Optional[bool] = None,
+        placa: Optional[str] = None,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None,
+        status_item: Optional[StatusItem] = None,
+        ordenar_por: Optional[str] = None,
+        tamanho_lote: int = 500
+    ) -> Iterator[Checklist]:
+        """
+        Mesmos filtros e ordenação de `listar_checklists`, mas devolve um
+        gerador: os checklists são lidos e convertidos em lotes de `tamanho_lote`.
+        """
+        checklists_db = ChecklistRepository.iterar_todos(
+            self._db,
+            tamanho_lote=tamanho_lote,
+            placa=placa,
+            data_inicio=data_inicio,
+            data_fim=data_fim,
+            finalizado=finalizado,
+            pago=pago,
+            status_item=status_item,
+            ordenar_por=ordenar_por
+        )
+        return (checklist_db_para_dominio(c) for c in checklists_db)
+    
     def atualizar_status_checklist(
         self,
         checklist_id: int,
@@ -251,6 +351,7 @@ class OficinaControllerDB:
             checklist_db.custo_real = custo_real
         
         self._db.commit()
+        self.notificar_alteracao()
         self._db.refresh(checklist_db)
         return checklist_db_para_dominio(checklist_db)
     
@@ -265,6 +366,7 @@ class OficinaControllerDB:
         checklist_db = ChecklistRepository.buscar_por_id(self._db, checklist.id)
         if checklist_db:
             ChecklistRepository.deletar(self._db, checklist_db)
+            self.notificar_alteracao()
             return True
         return False
     
@@ -273,6 +375,7 @@ class OficinaControllerDB:
         checklist_db = ChecklistRepository.buscar_por_id(self._db, checklist_id)
         if checklist_db:
             ChecklistRepository.deletar(self._db, checklist_db)
+            self.notificar_alteracao()
             return True
         return False
     
@@ -289,6 +392,75 @@ class OficinaControllerDB:
         )
         return [checklist_db_para_dominio(c) for c in checklists_db]
     
+    def colunas_checklists(
+        self,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Colunas (arrays NumPy) dos checklists do período, lidas direto do banco.
+        Usado pelo analytics para não converter cada checklist para o domínio.
+        """
+        return ChecklistRepository.colunas_analytics(
+            self._db,
+            data_inicio=data_inicio,
+            data_fim=data_fim
+        )
+    
+    def resumo_financeiro(
+        self,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None
+    ) -> Dict[str, int]:
+        """
+        Totais (em centavos) do relatório financeiro do período, agregados no
+        banco. Usado pelo analytics no lugar de ler checklist por checklist.
+        """
+        return ChecklistRepository.resumo_financeiro(
+            self._db,
+            data_inicio=data_inicio,
+            data_fim=data_fim
+        )
+    
+    def analytics_por_categoria(self) -> Dict[str, dict]:
+        """
+        Estatísticas por categoria de moto (total de motos, de checklists e
+        resumo dos custos estimados), calculadas numa única query agrupada.
+        Categorias sem motos aparecem zeradas.
+        """
+        from modelo.categoria_moto import CategoriaMoto, CATEGORIA_POR_CHAVE
+        
+        # categoria -> [motos, checklists, soma, max, min] (custos em centavos)
+        totais = {cat: [0, 0, 0, None, None] for cat in CategoriaMoto}
+        for valor, n_motos, n_checklists, soma, maximo, minimo in \
+                MotoRepository.agregados_por_categoria(self._db):
+            # Valores desconhecidos contam como OUTROS, como no conversor de domínio
+            t = totais[CATEGORIA_POR_CHAVE.get(valor, CategoriaMoto.OUTROS)]
+            t[0] += n_motos
+            t[1] += n_checklists
+            t[2] += soma
+            if maximo is not None:
+                t[3] = maximo if t[3] is None else max(t[3], maximo)
+                t[4] = minimo if t[4] is None else min(t[4], minimo)
+        
+        resultado = {}
+        for cat, (n_motos, n_checklists, soma, maximo, minimo) in totais.items():
+            if n_checklists:
+                resumo = {
+                    "soma": soma / 100,
+                    "media": soma / 100 / n_checklists,
+                    "max": maximo / 100,
+                    "min": minimo / 100,
+                }
+            else:
+                resumo = {"soma": 0.0, "media": 0.0, "max": 0.0, "min": 0.0}
+            resultado[cat.value] = {
+                "total_motos": n_motos,
+                "resumo_custos": resumo,
+                "total_checklists": n_checklists
+            }
+        return resultado
+    
     def buscar_checklists_por_status_item(self, status: StatusItem) -> List[Checklist]:
         """Busca checklists que possuem pelo menos um item com o status especificado."""
         # Usa query otimizada do repository
@@ -306,7 +478,10 @@ class OficinaControllerDB:
         Atualiza um item específico de um checklist.
         Retorna True se atualizado com sucesso.
         """
-        return ChecklistRepository.atualizar_item(
+        atualizado = ChecklistRepository.atualizar_item(
             self._db, checklist_id, item_index, status, custo_estimado
         )
+        if atualizado:
+            self.notificar_alteracao()
+        return atualizado
 
@@ -3,7 +3,49 @@
 Utilitários de validação para o sistema da oficina.
 """
 import re
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Tuple
+
+
+# Formatos aceitos (sobre a placa já normalizada, sem hífen/espaços):
+# - Antigo: ABC1234
+# - Mercosul: ABC1D23
+# - Alternativo: 6 a 8 caracteres alfanuméricos
+_PLACA_RE = re.compile(r'^(?:[A-Z]{3}\d{4}|[A-Z]{3}\d[A-Z]\d{2}|[A-Z0-9]{6,8})$')
+
+_MSG_PLACA_INVALIDA = (
+    "Placa inválida. Use o formato antigo (ABC-1234), "
+    "Mercosul (ABC1D23) ou formato alternativo (mínimo 6 caracteres alfanuméricos)."
+)
+
+
+# Funções puras sobre strings curtas e muito repetidas: vale memorizar.
+@lru_cache(maxsize=4096)
+def normalizar_e_validar(placa: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Normaliza e valida a placa de uma vez só.
+
+    Retorna: (placa_normalizada, None) se válida, ou (None, mensagem_erro).
+    """
+    if not placa:
+        return None, "Placa não pode ser vazia."
+
+    placa_limpa = normalizar_placa(placa)
+
+    if len(placa_limpa) < 6:
+        return None, "Placa deve ter no mínimo 6 caracteres."
+
+    if len(placa_limpa) > 8:
+        return None, "Placa deve ter no máximo 8 caracteres."
+
+    # Caminho rápido: o formato alternativo já cobre o antigo e o Mercosul, então
+    # com 6 a 8 caracteres qualquer placa ASCII alfanumérica é válida. A regex
+    # fica para o resto (\d também casa dígitos não ASCII).
+    if placa_limpa.isascii() and placa_limpa.isalnum():
+        return placa_limpa, None
+    if not _PLACA_RE.match(placa_limpa):
+        return None, _MSG_PLACA_INVALIDA
+    return placa_limpa, None
 
 
 def validar_placa_brasileira(placa: str) -> tuple[bool, Optional[str]]:
@@ -17,41 +59,11 @@ def validar_placa_brasileira(placa: str) -> tuple[bool, Optional[str]]:
     
     Retorna: (é_válida, mensagem_erro)
     """
-    if not placa:
-        return False, "Placa não pode ser vazia."
-    
-    # Remove espaços e hífens para normalizar
-    placa_limpa = placa.strip().upper().replace("-", "").replace(" ", "")
-    
-    # Verifica tamanho mínimo
-    if len(placa_limpa) < 6:
-        return False, "Placa deve ter no mínimo 6 caracteres."
-    
-    if len(placa_limpa) > 8:
-        return False, "Placa deve ter no máximo 8 caracteres."
-    
-    # Formato antigo: ABC1234 (7 caracteres)
-    padrao_antigo = re.compile(r'^[A-Z]{3}\d{4}$')
-    
-    # Formato Mercosul: ABC1D23 (7 caracteres)
-    padrao_mercosul = re.compile(r'^[A-Z]{3}\d[A-Z]\d{2}$')
-    
-    # Formato alternativo: mínimo 6 caracteres alfanuméricos
-    padrao_alternativo = re.compile(r'^[A-Z0-9]{6,8}$')
-    
-    if padrao_antigo.match(placa_limpa):
-        return True, None
-    elif padrao_mercosul.match(placa_limpa):
-        return True, None
-    elif padrao_alternativo.match(placa_limpa):
-        return True, None
-    else:
-        return False, (
-            "Placa inválida. Use o formato antigo (ABC-1234), "
-            "Mercosul (ABC1D23) ou formato alternativo (mínimo 6 caracteres alfanuméricos)."
-        )
+    _, erro = normalizar_e_validar(placa)
+    return erro is None, erro
 
 
+@lru_cache(maxsize=4096)
 def normalizar_placa(placa: str) -> str:
     """
     Normaliza a placa removendo espaços e hífens, deixando em maiúsculas.
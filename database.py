@@ -20,10 +20,22 @@ if database_url.startswith("postgresql://") and "psycopg" not in database_url:
         # Usa psycopg2 se psycopg3 não estiver disponível
         pass
 
+# Tamanho do pool só se aplica a bancos servidor (SQLite usa pool próprio)
+opcoes_pool = {}
+if not database_url.startswith("sqlite"):
+    opcoes_pool = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        # LIFO: reusa as conexões mais recentes e deixa as ociosas expirarem
+        "pool_use_lifo": True,
+    }
+
 engine = create_engine(
     database_url,
     pool_pre_ping=True,  # Verifica conexões antes de usar
-    echo=settings.ENVIRONMENT == "development"  # Log SQL em desenvolvimento
+    echo=settings.ENVIRONMENT == "development",  # Log SQL em desenvolvimento
+    **opcoes_pool
 )
 
 # Session factory
@@ -3,19 +3,15 @@
 Conversores entre modelos de domínio e modelos de banco de dados.
 """
 from modelo.moto import Moto
-from modelo.categoria_moto import CategoriaMoto
+from modelo.categoria_moto import CategoriaMoto, CATEGORIA_POR_CHAVE
 from modelo.checklist import Checklist
-from modelo.checklist_item import ChecklistItem, StatusItem
+from modelo.checklist_item import ChecklistItem, StatusItem, STATUS_POR_CHAVE
 from db.models import MotoDB, ChecklistDB, ChecklistItemDB
 
 
 def moto_db_para_dominio(moto_db: MotoDB) -> Moto:
     """Converte MotoDB para Moto (modelo de domínio)."""
-    categoria_enum = CategoriaMoto.OUTROS
-    for cat in CategoriaMoto:
-        if cat.value == moto_db.categoria:
-            categoria_enum = cat
-            break
+    categoria_enum = CATEGORIA_POR_CHAVE.get(moto_db.categoria, CategoriaMoto.OUTROS)
     
     return Moto(
         placa=moto_db.placa,
@@ -43,18 +39,13 @@ def checklist_db_para_dominio(checklist_db: ChecklistDB) -> Checklist:
     
     # Adiciona itens
     for item_db in checklist_db.itens:
-        status_enum = StatusItem.PENDENTE
-        for s in StatusItem:
-            if s.value == item_db.status:
-                status_enum = s
-                break
+        status_enum = STATUS_POR_CHAVE.get(item_db.status, StatusItem.PENDENTE)
         
         item = ChecklistItem(
             nome=item_db.nome,
             categoria=item_db.categoria,
             status=status_enum,
-            custo_estimado=item_db.custo_estimado,
-            id=item_db.id
+            custo_estimado=item_db.custo_estimado
         )
         checklist._itens.append(item)
     
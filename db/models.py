@@ -2,14 +2,21 @@
 """
 Modelos de banco de dados usando SQLAlchemy ORM.
 """
-from sqlalchemy import Column, Integer, String, Float, Date, Boolean, ForeignKey, Enum as SQLEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, Date, Boolean, ForeignKey, Index, Enum as SQLEnum, DDL, event, true
+from sqlalchemy.orm import relationship, validates
 from datetime import date
 import enum
 
 from database import Base
 from modelo.categoria_moto import CategoriaMoto
 from modelo.checklist_item import StatusItem
+from utils.moeda import para_centavos
+from controle.validadores import normalizar_placa
+from db.resumos import (
+    CRIAR_FINANCEIRO_DIARIO,
+    CRIAR_INDICE_FINANCEIRO_DIARIO,
+    REMOVER_FINANCEIRO_DIARIO,
+)
 
 
 class MotoDB(Base):
@@ -19,14 +26,19 @@ class MotoDB(Base):
     id = Column(Integer, primary_key=True, index=True)
     placa = Column(String(8), unique=True, index=True, nullable=False)
     marca = Column(String(100), nullable=False)
-    modelo = Column(String(100), nullable=False)
-    ano = Column(Integer, nullable=False)
+    modelo = Column(String(100), nullable=False, index=True)
+    ano = Column(Integer, nullable=False, index=True)
     cilindradas = Column(Integer, nullable=False)
     categoria = Column(String(50), nullable=False)  # Armazena o value do enum
     
     # Relacionamento com checklists
     checklists = relationship("ChecklistDB", back_populates="moto", cascade="all, delete-orphan")
     
+    @validates("placa")
+    def _normalizar_placa(self, key, valor):
+        """Placa sempre gravada normalizada: as buscas comparam por igualdade no índice."""
+        return normalizar_placa(valor)
+    
     def __repr__(self):
         return f"<MotoDB(id={self.id}, placa={self.placa}, modelo={self.modelo})>"
 
@@ -34,6 +46,10 @@ class MotoDB(Base):
 class ChecklistDB(Base):
     """Modelo de banco de dados para Checklist."""
     __tablename__ = "checklists"
+    __table_args__ = (
+        # Relatórios financeiros filtram por período (e status de pagamento)
+        Index("ix_checklists_data_revisao_pago", "data_revisao", "pago"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     moto_id = Column(Integer, ForeignKey("motos.id"), nullable=False)
@@ -42,10 +58,35 @@ class ChecklistDB(Base):
     finalizado = Column(Boolean, default=False, nullable=False)
     pago = Column(Boolean, default=False, nullable=False)
     custo_real = Column(Float, nullable=True)  # Custo real da revisão (opcional)
+    # custo_real em centavos, mantido em sincronia pelo validador abaixo
+    custo_real_centavos = Column(Integer, nullable=True)
+    # Soma dos itens que necessitam troca (Checklist.custo_total_estimado()) em centavos,
+    # gravada junto com o checklist para o analytics não precisar somar os itens
+    custo_total_estimado_centavos = Column(Integer, default=0, nullable=False, server_default="0")
     
     # Relacionamentos
     moto = relationship("MotoDB", back_populates="checklists")
-    itens = relationship("ChecklistItemDB", back_populates="checklist", cascade="all, delete-orphan")
+    # Itens sempre na ordem de inserção (item_index da API depende disso)
+    itens = relationship(
+        "ChecklistItemDB",
+        back_populates="checklist",
+        cascade="all, delete-orphan",
+        order_by="ChecklistItemDB.id",
+    )
+    
+    @validates("custo_real")
+    def _validar_custo_real(self, key, valor):
+        """Atualiza custo_real_centavos sempre que custo_real é atribuído."""
+        self.custo_real_centavos = para_centavos(valor) if valor is not None else None
+        return valor
+    
+    def recalcular_custo_total_estimado(self) -> int:
+        """Recalcula o custo estimado (em centavos) a partir dos itens carregados."""
+        self.custo_total_estimado_centavos = sum(
+            para_centavos(item.custo_estimado) for item in self.itens
+            if item.status == StatusItem.NECESSITA_TROCA.value
+        )
+        return self.custo_total_estimado_centavos
     
     def __repr__(self):
         return f"<ChecklistDB(id={self.id}, moto_id={self.moto_id}, km={self.km_atual})>"
@@ -77,9 +118,17 @@ class UsuarioDB(Base):
     username = Column(String(50), unique=True, index=True, nullable=False)
     email = Column(String(100), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
-    is_active = Column(String(10), default="true", nullable=False)
+    is_active = Column(Boolean, default=True, nullable=False, server_default=true())
     is_admin = Column(String(10), default="false", nullable=False)
     
     def __repr__(self):
         return f"<UsuarioDB(id={self.id}, username={self.username})>"
 
+
+# Visão materializada dos relatórios financeiros (ver db/resumos.py), criada
+# junto com as tabelas no create_all. Só no PostgreSQL.
+for _sql in (CRIAR_FINANCEIRO_DIARIO, CRIAR_INDICE_FINANCEIRO_DIARIO):
+    event.listen(Base.metadata, "after_create", DDL(_sql).execute_if(dialect="postgresql"))
+event.listen(
+    Base.metadata, "before_drop", DDL(REMOVER_FINANCEIRO_DIARIO).execute_if(dialect="postgresql")
+)
@@ -3,17 +3,55 @@
 Repositório para acesso ao banco de dados.
 Separa a lógica de acesso aos dados da lógica de negócio.
 """
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import and_, or_, case, column, exists, func, insert, table
+from typing import Dict, Iterator, List, Optional
 from datetime import date
 
+import numpy as np
+
 from db.models import MotoDB, ChecklistDB, ChecklistItemDB, UsuarioDB
+from db.resumos import usa_resumos
 from modelo.moto import Moto
 from modelo.categoria_moto import CategoriaMoto
 from modelo.checklist import Checklist
 from modelo.checklist_item import ChecklistItem, StatusItem
 from controle.validadores import normalizar_placa
+from utils.moeda import para_centavos
+
+
+# Campos aceitos em `ordenar_por` -> ORDER BY correspondente
+_ORDENACAO_MOTOS = {
+    "placa": MotoDB.placa.asc(),
+    "modelo": MotoDB.modelo.asc(),
+    "ano": MotoDB.ano.desc(),
+    "marca": MotoDB.marca.asc(),
+}
+
+# Visão materializada com os totais por (dia, moto), ver db/resumos.py
+_FINANCEIRO_DIARIO = table(
+    "financeiro_diario",
+    column("data_revisao"),
+    column("moto_id"),
+    column("quantidade_servicos"),
+    column("checklists_pagos"),
+    column("receitas_centavos"),
+    column("custos_centavos"),
+)
+
+_ORDENACAO_CHECKLISTS = {
+    "data": ChecklistDB.data_revisao.desc(),
+    "km": ChecklistDB.km_atual.desc(),
+    "custo": ChecklistDB.custo_total_estimado_centavos.desc(),
+}
+
+# Relacionamentos usados por checklist_db_para_dominio, carregados junto com
+# os checklists: itens numa segunda query (IN), moto no próprio SELECT.
+# Uma página de N checklists custa 2 queries em vez de 1 + 2N.
+_CARREGAR_CHECKLIST = (
+    selectinload(ChecklistDB.itens),
+    joinedload(ChecklistDB.moto),
+)
 
 
 class MotoRepository:
@@ -42,9 +80,33 @@ class MotoRepository:
         return db.query(MotoDB).filter(MotoDB.placa == placa_norm).first()
     
     @staticmethod
-    def listar_todas(db: Session, skip: int = 0, limit: Optional[int] = None) -> List[MotoDB]:
-        """Lista todas as motos."""
+    def existe(db: Session, placa: str) -> bool:
+        """
+        Verifica se há moto com a placa (SELECT EXISTS, resolvido pelo índice
+        único da placa), sem carregar a linha nem montar objetos.
+        """
+        placa_norm = normalizar_placa(placa)
+        return db.query(exists().where(MotoDB.placa == placa_norm)).scalar()
+    
+    @staticmethod
+    def listar_todas(
+        db: Session,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        ordenar_por: Optional[str] = None
+    ) -> List[MotoDB]:
+        """
+        Lista as motos com ordenação e paginação feitas no banco
+        (ORDER BY / OFFSET / LIMIT). Campo desconhecido mantém a ordem de cadastro.
+        """
         query = db.query(MotoDB)
+        ordem = _ORDENACAO_MOTOS.get(ordenar_por.lower()) if ordenar_por else None
+        if ordem is not None:
+            query = query.order_by(ordem, MotoDB.id)
+        else:
+            query = query.order_by(MotoDB.id)
+        
+        skip = max(skip, 0)
         if limit:
             return query.offset(skip).limit(limit).all()
         return query.offset(skip).all()
@@ -68,6 +130,28 @@ class MotoRepository:
         db.refresh(moto_db)
         return moto_db
     
+    @staticmethod
+    def agregados_por_categoria(db: Session) -> List[tuple]:
+        """
+        Uma única query agrupada por categoria (value gravado em motos.categoria):
+        (categoria, total_motos, total_checklists, soma, max, min), com os custos
+        estimados dos checklists em centavos. Motos sem checklist entram via LEFT JOIN.
+        """
+        custo = ChecklistDB.custo_total_estimado_centavos
+        return (
+            db.query(
+                MotoDB.categoria,
+                func.count(func.distinct(MotoDB.id)),
+                func.count(ChecklistDB.id),
+                func.coalesce(func.sum(custo), 0),
+                func.max(custo),
+                func.min(custo),
+            )
+            .outerjoin(ChecklistDB, ChecklistDB.moto_id == MotoDB.id)
+            .group_by(MotoDB.categoria)
+            .all()
+        )
+    
     @staticmethod
     def deletar(db: Session, moto_db: MotoDB) -> bool:
         """Deleta uma moto."""
@@ -88,21 +172,28 @@ class ChecklistRepository:
             data_revisao=checklist.data_revisao,
             finalizado=checklist.finalizado,
             pago=checklist.pago,
-            custo_real=checklist.custo_real
+            custo_real=checklist.custo_real,
+            custo_total_estimado_centavos=sum(
+                para_centavos(item.custo_estimado) for item in checklist.itens
+                if item.status == StatusItem.NECESSITA_TROCA
+            )
         )
         db.add(checklist_db)
         db.flush()  # Para obter o ID
         
-        # Adiciona itens
-        for item in checklist.itens:
-            item_db = ChecklistItemDB(
-                checklist_id=checklist_db.id,
-                nome=item.nome,
-                categoria=item.categoria,
-                status=item.status.value,
-                custo_estimado=item.custo_estimado
-            )
-            db.add(item_db)
+        # Adiciona itens num único INSERT em lote (executemany / insertmanyvalues)
+        linhas_itens = [
+            {
+                "checklist_id": checklist_db.id,
+                "nome": item.nome,
+                "categoria": item.categoria,
+                "status": item.status.value,
+                "custo_estimado": item.custo_estimado,
+            }
+            for item in checklist.itens
+        ]
+        if linhas_itens:
+            db.execute(insert(ChecklistItemDB), linhas_itens)
         
         db.commit()
         db.refresh(checklist_db)
@@ -111,23 +202,24 @@ class ChecklistRepository:
     @staticmethod
     def buscar_por_id(db: Session, checklist_id: int) -> Optional[ChecklistDB]:
         """Busca checklist por ID."""
-        from sqlalchemy.orm import joinedload
-        return db.query(ChecklistDB).options(joinedload(ChecklistDB.itens)).filter(ChecklistDB.id == checklist_id).first()
+        return db.query(ChecklistDB).options(*_CARREGAR_CHECKLIST).filter(ChecklistDB.id == checklist_id).first()
     
     @staticmethod
-    def listar_todos(
+    def _query_listagem(
         db: Session,
-        skip: int = 0,
-        limit: Optional[int] = None,
         placa: Optional[str] = None,
         data_inicio: Optional[date] = None,
         data_fim: Optional[date] = None,
         finalizado: Optional[bool] = None,
-        pago: Optional[bool] = None
-    ) -> List[ChecklistDB]:
-        """Lista checklists com filtros."""
-        from sqlalchemy.orm import joinedload
-        query = db.query(ChecklistDB).options(joinedload(ChecklistDB.itens))
+        pago: Optional[bool] = None,
+        status_item: Optional[StatusItem] = None,
+        ordenar_por: Optional[str] = None
+    ):
+        """
+        Query de checklists com filtros (combinados) e ordenação.
+        Sem `ordenar_por`, ordena por data (mais recente primeiro).
+        """
+        query = db.query(ChecklistDB).options(*_CARREGAR_CHECKLIST)
         
         if placa:
             placa_norm = normalizar_placa(placa)
@@ -145,20 +237,55 @@ class ChecklistRepository:
         if pago is not None:
             query = query.filter(ChecklistDB.pago == pago)
         
-        query = query.order_by(ChecklistDB.data_revisao.desc())
+        if status_item is not None:
+            # EXISTS em vez de JOIN + DISTINCT
+            query = query.filter(ChecklistDB.itens.any(ChecklistItemDB.status == status_item.value))
         
+        ordem = _ORDENACAO_CHECKLISTS.get(ordenar_por.lower()) if ordenar_por else None
+        if ordem is not None:
+            return query.order_by(ordem, ChecklistDB.data_revisao.desc(), ChecklistDB.id)
+        return query.order_by(ChecklistDB.data_revisao.desc(), ChecklistDB.id)
+    
+    @staticmethod
+    def listar_todos(
+        db: Session,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        placa: Optional[str] = None,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None,
+        finalizado: Optional[bool] = None,
+        pago: Optional[bool] = None,
+        status_item: Optional[StatusItem] = None,
+        ordenar_por: Optional[str] = None
+    ) -> List[ChecklistDB]:
+        """
+        Lista checklists com filtros (combinados), ordenação e paginação
+        feitas no banco. Sem `ordenar_por`, ordena por data (mais recente primeiro).
+        """
+        query = ChecklistRepository._query_listagem(
+            db, placa, data_inicio, data_fim, finalizado, pago, status_item, ordenar_por
+        )
+        skip = max(skip, 0)
         if limit:
             return query.offset(skip).limit(limit).all()
         return query.offset(skip).all()
     
+    @staticmethod
+    def iterar_todos(db: Session, tamanho_lote: int = 500, **filtros) -> Iterator[ChecklistDB]:
+        """
+        Percorre os checklists (mesmos filtros de `listar_todos`) lendo do
+        banco em lotes de `tamanho_lote` (yield_per), sem carregar a tabela toda.
+        """
+        return iter(ChecklistRepository._query_listagem(db, **filtros).yield_per(tamanho_lote))
+    
     @staticmethod
     def buscar_por_moto(db: Session, placa: str) -> List[ChecklistDB]:
         """Busca checklists de uma moto."""
-        from sqlalchemy.orm import joinedload
         placa_norm = normalizar_placa(placa)
         return (
             db.query(ChecklistDB)
-            .options(joinedload(ChecklistDB.itens))
+            .options(*_CARREGAR_CHECKLIST)
             .join(MotoDB)
             .filter(MotoDB.placa == placa_norm)
             .order_by(ChecklistDB.data_revisao.desc())
@@ -200,6 +327,7 @@ class ChecklistRepository:
         if custo_estimado is not None:
             item_db.custo_estimado = custo_estimado
         
+        checklist_db.recalcular_custo_total_estimado()
         db.commit()
         return True
     
@@ -216,10 +344,9 @@ class ChecklistRepository:
         Busca checklists que possuem pelo menos um item com o status especificado.
         Query otimizada usando JOIN ao invés de filtrar em memória.
         """
-        from sqlalchemy.orm import joinedload
         return (
             db.query(ChecklistDB)
-            .options(joinedload(ChecklistDB.itens))
+            .options(*_CARREGAR_CHECKLIST)
             .join(ChecklistItemDB)
             .filter(ChecklistItemDB.status == status.value)
             .distinct()
@@ -227,6 +354,98 @@ class ChecklistRepository:
             .all()
         )
 
+    @staticmethod
+    def colunas_analytics(
+        db: Session,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Retorna as colunas usadas pelo analytics (uma por campo, como arrays
+        NumPy alinhados), sem montar objetos ORM nem de domínio.
+        Os valores em dinheiro vêm em centavos (colunas *_centavos de checklists).
+        """
+        query = db.query(
+            ChecklistDB.km_atual,
+            ChecklistDB.custo_total_estimado_centavos,
+            ChecklistDB.custo_real_centavos,
+            ChecklistDB.pago,
+            ChecklistDB.moto_id,
+            ChecklistDB.finalizado,
+        )
+
+        if data_inicio:
+            query = query.filter(ChecklistDB.data_revisao >= data_inicio)
+
+        if data_fim:
+            query = query.filter(ChecklistDB.data_revisao <= data_fim)
+
+        linhas = query.all()
+        n = len(linhas)
+
+        return {
+            "kms": np.fromiter((l[0] for l in linhas), dtype=np.int64, count=n),
+            "custos_centavos": np.fromiter((l[1] for l in linhas), dtype=np.int64, count=n),
+            "custos_reais_centavos": np.fromiter(
+                (l[2] or 0 for l in linhas), dtype=np.int64, count=n
+            ),
+            "tem_custo_real": np.fromiter((l[2] is not None for l in linhas), dtype=bool, count=n),
+            "pagos": np.fromiter((l[3] for l in linhas), dtype=bool, count=n),
+            # moto_id basta para contar motos distintas (sem JOIN com motos)
+            "motos": np.fromiter((l[4] for l in linhas), dtype=np.int64, count=n),
+            "finalizados": np.fromiter((l[5] for l in linhas), dtype=bool, count=n),
+        }
+
+    @staticmethod
+    def resumo_financeiro(
+        db: Session,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None
+    ) -> Dict[str, int]:
+        """
+        Totais do relatório financeiro do período numa única query agregada:
+        quantidade_servicos, checklists_pagos, receitas_centavos (estimado dos
+        pagos), custos_centavos (custo real) e quantidade_motos.
+
+        No PostgreSQL soma as linhas da visão financeiro_diario; nos demais
+        bancos agrega direto em checklists.
+        """
+        if usa_resumos(db.get_bind()):
+            v = _FINANCEIRO_DIARIO.c
+            data_revisao = v.data_revisao
+            colunas = (
+                func.sum(v.quantidade_servicos),
+                func.sum(v.checklists_pagos),
+                func.sum(v.receitas_centavos),
+                func.sum(v.custos_centavos),
+                func.count(func.distinct(v.moto_id)),
+            )
+        else:
+            data_revisao = ChecklistDB.data_revisao
+            colunas = (
+                func.count(ChecklistDB.id),
+                func.sum(case((ChecklistDB.pago, 1), else_=0)),
+                func.sum(case((ChecklistDB.pago, ChecklistDB.custo_total_estimado_centavos), else_=0)),
+                func.sum(ChecklistDB.custo_real_centavos),
+                func.count(func.distinct(ChecklistDB.moto_id)),
+            )
+
+        query = db.query(*colunas)
+        if data_inicio:
+            query = query.filter(data_revisao >= data_inicio)
+        if data_fim:
+            query = query.filter(data_revisao <= data_fim)
+
+        # SUM de nenhuma linha é NULL; no PostgreSQL SUM(bigint) vem como Decimal
+        servicos, pagos, receitas, custos, motos = query.one()
+        return {
+            "quantidade_servicos": int(servicos or 0),
+            "checklists_pagos": int(pagos or 0),
+            "receitas_centavos": int(receitas or 0),
+            "custos_centavos": int(custos or 0),
+            "quantidade_motos": int(motos or 0),
+        }
+
 
 class UsuarioRepository:
     """Repositório para operações com Usuários."""
@@ -255,6 +474,16 @@ class UsuarioRepository:
         """Busca usuário por email."""
         return db.query(UsuarioDB).filter(UsuarioDB.email == email).first()
     
+    @staticmethod
+    def buscar_por_username_ou_email(db: Session, username: str, email: str) -> Optional[UsuarioDB]:
+        """Busca um usuário que tenha o username OU o email informado (uma única query)."""
+        return (
+            db.query(UsuarioDB)
+            .filter(or_(UsuarioDB.username == username, UsuarioDB.email == email))
+            .order_by((UsuarioDB.username == username).desc())  # username tem prioridade
+            .first()
+        )
+    
     @staticmethod
     def buscar_por_id(db: Session, user_id: int) -> Optional[UsuarioDB]:
         """Busca usuário por ID."""
@@ -0,0 +1,101 @@
+# db/resumos.py
+"""
+Resumos pré-agregados para os relatórios (só PostgreSQL).
+
+`financeiro_diario` é uma visão materializada com os totais financeiros por
+dia e moto: o relatório de um período soma poucas linhas em vez de varrer
+todos os checklists. A visão é atualizada (REFRESH ... CONCURRENTLY) numa
+thread, alguns segundos depois das escritas; escritas próximas viram um único
+refresh. Até lá o relatório mostra os totais anteriores.
+"""
+import threading
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from config import settings
+from database import engine
+from utils.logger import logger
+
+
+# Agrupa por (dia, moto) e não só por dia: assim a quantidade de motos
+# distintas de qualquer período continua exata (COUNT(DISTINCT moto_id)).
+# Mesma SQL da migração 009.
+CRIAR_FINANCEIRO_DIARIO = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS financeiro_diario AS
+SELECT
+    data_revisao,
+    moto_id,
+    COUNT(*) AS quantidade_servicos,
+    COUNT(*) FILTER (WHERE pago) AS checklists_pagos,
+    COALESCE(SUM(custo_total_estimado_centavos) FILTER (WHERE pago), 0) AS receitas_centavos,
+    COALESCE(SUM(custo_real_centavos), 0) AS custos_centavos
+FROM checklists
+GROUP BY data_revisao, moto_id
+WITH DATA
+"""
+
+# Índice único: exigido pelo REFRESH CONCURRENTLY (leituras não bloqueiam)
+CRIAR_INDICE_FINANCEIRO_DIARIO = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_financeiro_diario_data_moto "
+    "ON financeiro_diario (data_revisao, moto_id)"
+)
+
+REMOVER_FINANCEIRO_DIARIO = "DROP MATERIALIZED VIEW IF EXISTS financeiro_diario"
+
+_ATUALIZAR_FINANCEIRO_DIARIO = "REFRESH MATERIALIZED VIEW CONCURRENTLY financeiro_diario"
+
+
+def usa_resumos(engine_ou_bind) -> bool:
+    """Os resumos só existem no PostgreSQL (SQLite não tem visão materializada)."""
+    return engine_ou_bind.dialect.name == "postgresql"
+
+
+class AtualizadorResumos:
+    """
+    Agenda o refresh das visões materializadas após escritas, com espera de
+    `atraso_segundos`: a primeira escrita agenda, as seguintes (até o refresh
+    começar) aproveitam o mesmo. Escritas durante o refresh agendam outro.
+    """
+
+    def __init__(self, engine: Engine, atraso_segundos: float = 2.0):
+        self._engine = engine
+        self._atraso = atraso_segundos
+        self._ativo = usa_resumos(engine)
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        # Chamado depois de cada refresh (ex.: invalidar o cache de respostas)
+        self.ao_atualizar: Optional[Callable[[], None]] = None
+
+    def agendar(self) -> None:
+        if not self._ativo:
+            return
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self._atraso, self._atualizar)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancelar(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _atualizar(self) -> None:
+        with self._lock:
+            self._timer = None
+        try:
+            with self._engine.begin() as conn:
+                conn.execute(text(_ATUALIZAR_FINANCEIRO_DIARIO))
+        except Exception as e:
+            # Fica com os totais anteriores; a próxima escrita tenta de novo
+            logger.error(f"Erro ao atualizar financeiro_diario: {e}")
+            return
+        if self.ao_atualizar is not None:
+            self.ao_atualizar()
+
+
+atualizador_resumos = AtualizadorResumos(engine, settings.FINANCEIRO_REFRESH_DELAY_SECONDS)
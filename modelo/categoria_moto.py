@@ -8,3 +8,10 @@ class CategoriaMoto(Enum):
     ESPORTIVA = "Esportiva"
     CROSS = "Cross"
     OUTROS = "Outros"
+
+
+# Busca O(1) da categoria pelo value ("Big trail") ou pelo name ("BIG_TRAIL")
+CATEGORIA_POR_CHAVE = {
+    **{c.value: c for c in CategoriaMoto},
+    **{c.name: c for c in CategoriaMoto},
+}
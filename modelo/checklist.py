@@ -15,6 +15,9 @@ class Checklist:
         if km_atual < 0:
             raise ValueError("Quilometragem não pode ser negativa.")
 
+        # Dicionário de to_dict() já montado (sem a moto, que tem o próprio cache);
+        # qualquer atribuição o invalida, inclusive invalidar_custo()
+        self._dict_cache: dict | None = None
         self._id = id
         self._moto = moto
         self._km_atual = km_atual
@@ -23,6 +26,8 @@ class Checklist:
         self._finalizado = finalizado
         self._pago = pago
         self._custo_real = custo_real
+        # Soma dos itens NECESSITA_TROCA; None = precisa recalcular
+        self._custo_cache: float | None = None
     
     @property
     def id(self) -> int | None:
@@ -82,6 +87,20 @@ class Checklist:
         if not isinstance(item, ChecklistItem):
             raise ValueError("Item inválido.")
         self._itens.append(item)
+        self._custo_cache = None
+
+    def invalidar_custo(self) -> None:
+        """
+        Descarta o custo total (e o to_dict) em cache. Deve ser chamado quando
+        o status ou o custo de um item já adicionado for alterado diretamente.
+        """
+        self._custo_cache = None
+
+    def __setattr__(self, nome: str, valor) -> None:
+        # Cobre setters, adicionar_item/invalidar_custo e atribuições diretas
+        if nome != "_dict_cache":
+            self.__dict__["_dict_cache"] = None
+        super().__setattr__(nome, valor)
     
     
     
@@ -106,21 +125,41 @@ class Checklist:
     def custo_total_estimado(self) -> float:
         """
         Soma somente o custo dos itens marcados como NECESSITA_TROCA.
+        O valor fica em cache até um item ser adicionado ou invalidar_custo().
         """
-        return sum(item.custo_estimado for item in self._itens if item.status == StatusItem.NECESSITA_TROCA)
+        if self._custo_cache is None:
+            self._custo_cache = sum(
+                item.custo_estimado for item in self._itens
+                if item.status == StatusItem.NECESSITA_TROCA
+            )
+        return self._custo_cache
 
     def to_dict(self) -> dict:
-        """Converte o checklist para dicionário (serialização JSON)."""
+        """
+        Converte o checklist para dicionário (serialização JSON).
+        O dicionário é montado uma vez e reaproveitado até o checklist mudar;
+        a lista de itens é compartilhada entre as chamadas: não deve ser modificada.
+        """
+        if self._dict_cache is None:
+            self._dict_cache = self._montar_dict()
+        d = dict(self._dict_cache)
+        d["moto"] = self._moto_dict()
+        return d
+
+    def _moto_dict(self) -> dict:
+        return self.moto.to_dict() if hasattr(self.moto, 'to_dict') else {
+            "placa": self.moto.placa,
+            "marca": self.moto.marca,
+            "modelo": self.moto.modelo,
+            "ano": self.moto.ano
+        }
+
+    def _montar_dict(self) -> dict:
         return {
             "id": self._id,
-            "moto": self.moto.to_dict() if hasattr(self.moto, 'to_dict') else {
-                "placa": self.moto.placa,
-                "marca": self.moto.marca,
-                "modelo": self.moto.modelo,
-                "ano": self.moto.ano
-            },
+            "moto": None,  # preenchida em to_dict (a moto pode mudar sem o checklist)
             "km_atual": self.km_atual,
-            "data_revisao": self.data_revisao.isoformat(),
+            "data_revisao": self.data_revisao,  # orjson/pydantic serializam date em ISO
             "data_formatada": self.data_formatada,
             "finalizado": self._finalizado,
             "pago": self._pago,
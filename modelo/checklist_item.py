@@ -9,6 +9,21 @@ class StatusItem(Enum):
     IGNORADO = "ignorado"
 
 
+# Busca O(1) do status pelo value ("necessita_troca") ou pelo name ("NECESSITA_TROCA")
+STATUS_POR_CHAVE = {
+    **{s.value: s for s in StatusItem},
+    **{s.name: s for s in StatusItem},
+}
+
+
+def status_por_texto(texto: str) -> "StatusItem | None":
+    """
+    Converte um texto no StatusItem correspondente, aceitando o value ou o
+    name em qualquer caixa. Retorna None se não houver correspondência.
+    """
+    return STATUS_POR_CHAVE.get(texto.lower()) or STATUS_POR_CHAVE.get(texto.upper())
+
+
 class ChecklistItem:
     """
     Representa um item do checklist de revisão da moto.
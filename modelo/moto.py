@@ -17,6 +17,8 @@ class Moto(Veiculo):
         cilindradas: int,
         categoria: CategoriaMoto = CategoriaMoto.OUTROS,  # <-- NOVO PARÂMETRO
     ):
+        # Dicionário de to_dict() já montado; qualquer atribuição o invalida
+        self._dict_cache: dict | None = None
         super().__init__(placa, marca, modelo, ano)
         self._set_cilindradas(cilindradas)
         self._categoria = categoria  # simples, sem setter chato
@@ -42,8 +44,19 @@ class Moto(Veiculo):
             f"Ano: {self.ano} | Cilindradas: {self.cilindradas}cc"
         )
     
+    def __setattr__(self, nome: str, valor) -> None:
+        # Cobre os _set_* e atribuições diretas (ex.: moto._categoria = ...)
+        if nome != "_dict_cache":
+            self.__dict__["_dict_cache"] = None
+        super().__setattr__(nome, valor)
+
     def to_dict(self) -> dict:
         """Converte a moto para dicionário (serialização JSON)."""
+        if self._dict_cache is None:
+            self._dict_cache = self._montar_dict()
+        return dict(self._dict_cache)
+
+    def _montar_dict(self) -> dict:
         return {
             "placa": self.placa,
             "marca": self.marca,
@@ -0,0 +1,17 @@
+# tests/conftest.py
+"""
+Configuração comum dos testes.
+"""
+import pytest
+
+import db.models  # noqa: F401  (registra as tabelas no Base.metadata)
+from database import init_db
+
+
+@pytest.fixture(scope="session", autouse=True)
+def criar_tabelas():
+    """
+    Cria as tabelas uma vez por sessão de testes. Os TestClient dos testes
+    não entram no lifespan da API, que é onde o init_db roda.
+    """
+    init_db()
@@ -85,6 +85,52 @@ def test_login_invalid_credentials():
     assert response.status_code == 401
 
 
+def test_login_rate_limit():
+    """Testa que o login é bloqueado após exceder o limite de tentativas."""
+    from api.auth import limitador_login
+    from config import settings
+
+    limitador_login.limpar()
+    try:
+        for _ in range(settings.LOGIN_RATE_LIMIT_PER_MINUTE):
+            response = client.post(
+                "/api/auth/login",
+                data={"username": "nonexistent", "password": "wrongpassword"}
+            )
+            assert response.status_code == 401
+
+        response = client.post(
+            "/api/auth/login",
+            data={"username": "nonexistent", "password": "wrongpassword"}
+        )
+        assert response.status_code == 429
+    finally:
+        limitador_login.limpar()
+
+
+def test_login_sucesso_nao_conta_no_limite(db_session: Session):
+    """Testa que logins bem-sucedidos não consomem o limite de tentativas."""
+    from api.auth import limitador_login
+    from config import settings
+
+    UsuarioRepository.criar(
+        db_session,
+        username="ratelimituser",
+        email="ratelimit@example.com",
+        hashed_password=get_password_hash("testpassword")
+    )
+    limitador_login.limpar()
+    try:
+        for _ in range(settings.LOGIN_RATE_LIMIT_PER_MINUTE + 1):
+            response = client.post(
+                "/api/auth/login",
+                data={"username": "ratelimituser", "password": "testpassword"}
+            )
+            assert response.status_code == 200
+    finally:
+        limitador_login.limpar()
+
+
 def test_get_current_user(test_user):
     """Testa obtenção de informações do usuário atual."""
     # Primeiro faz login
@@ -0,0 +1,71 @@
+# tests/test_checklists.py
+"""
+Testes para endpoints de checklists.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from api.main_db import app
+from auth.security import get_password_hash
+from db.repository import UsuarioRepository
+from database import SessionLocal
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def auth_headers():
+    """Cria (se preciso) um usuário de teste e retorna o cabeçalho com o token."""
+    db = SessionLocal()
+    try:
+        if not UsuarioRepository.buscar_por_username(db, "checklistuser"):
+            UsuarioRepository.criar(
+                db,
+                username="checklistuser",
+                email="checklist@example.com",
+                hashed_password=get_password_hash("testpassword")
+            )
+    finally:
+        db.close()
+
+    response = client.post(
+        "/api/auth/login",
+        data={"username": "checklistuser", "password": "testpassword"}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_listar_checklists_com_itens(auth_headers):
+    """Testa que checklists com itens do banco são listados com seus itens."""
+    client.post(
+        "/api/motos",
+        headers=auth_headers,
+        json={
+            "placa": "CKL1A23",
+            "marca": "Honda",
+            "modelo": "XRE 300",
+            "ano": 2022,
+            "cilindradas": 291,
+            "categoria": "NAKED"
+        }
+    )
+    criado = client.post(
+        "/api/checklists",
+        headers=auth_headers,
+        json={
+            "placa_moto": "CKL1A23",
+            "km_atual": 10000,
+            "itens": [
+                {"nome": "Óleo do motor", "status": "necessita_troca", "custo_estimado": 80.0},
+                {"nome": "Pastilhas de freio", "status": "concluido"}
+            ]
+        }
+    )
+    assert criado.status_code == 201
+
+    response = client.get("/api/checklists", headers=auth_headers, params={"placa": "CKL1A23"})
+    assert response.status_code == 200
+    checklists = response.json()
+    assert len(checklists) == 1
+    assert [i["status"] for i in checklists[0]["itens"]] == ["necessita_troca", "concluido"]
+    assert checklists[0]["custo_total_estimado"] == 80.0
@@ -120,3 +120,41 @@ def test_buscar_moto_por_placa(auth_token):
     data = response.json()
     assert data["placa"] == "XYZ9876"
 
+
+
+def test_listar_motos_reflete_cadastro(auth_token):
+    """Testa que o cache da listagem é invalidado ao cadastrar uma moto."""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    antes = client.get("/api/motos", headers=headers).json()
+    
+    client.post(
+        "/api/motos",
+        headers=headers,
+        json={
+            "placa": "CCH4E21",
+            "marca": "Honda",
+            "modelo": "CB500F",
+            "ano": 2023,
+            "cilindradas": 471,
+            "categoria": "NAKED"
+        }
+    )
+    
+    depois = client.get("/api/motos", headers=headers).json()
+    assert "CCH4E21" not in [m["placa"] for m in antes]
+    assert "CCH4E21" in [m["placa"] for m in depois]
+
+
+def test_listar_motos_cache_mantem_cors(auth_token):
+    """Testa que a resposta servida pelo cache também traz os cabeçalhos de CORS."""
+    headers = {
+        "Authorization": f"Bearer {auth_token}",
+        "Origin": "http://localhost:5173",
+    }
+    primeira = client.get("/api/motos", params={"limit": 7}, headers=headers)
+    segunda = client.get("/api/motos", params={"limit": 7}, headers=headers)
+
+    assert segunda.headers.get("x-cache") == "HIT"
+    for resposta in (primeira, segunda):
+        assert resposta.headers.get("access-control-allow-origin") == "http://localhost:5173"
+        assert resposta.headers.get("access-control-allow-credentials") == "true"
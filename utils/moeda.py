@@ -0,0 +1,16 @@
+# utils/moeda.py
+"""
+Conversões de valores em R$ para centavos inteiros.
+Somas de dinheiro em centavos são exatas (sem erro de arredondamento de float).
+"""
+import numpy as np
+
+
+def para_centavos(valor: float) -> int:
+    """Converte um valor em reais para centavos (inteiro)."""
+    return int(round(valor * 100))
+
+
+def array_para_centavos(valores: np.ndarray) -> np.ndarray:
+    """Converte um array de valores em reais para centavos (int64)."""
+    return np.rint(np.asarray(valores, dtype=np.float64) * 100).astype(np.int64)